@@ -1,5 +1,5 @@
 from __future__ import print_function
-import logging.handlers
+import os
 import sys
 
 
@@ -7,26 +7,42 @@ if sys.version_info.major < 3:
     print("Curly only supports Python3 or greater. Rerun application in Python3 environment.")
     exit(0)
 
-from interpreter.CurlyInterpreter import CurlyInterpreter
 
-log_handler = logging.handlers.RotatingFileHandler(filename="curlframework.log", maxBytes=500000)
-log_formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s       %(message)s")
-log_handler.setFormatter(log_formatter)
-LOGGER = logging.getLogger()
-LOGGER.setLevel(logging.DEBUG)
-LOGGER.addHandler(log_handler)
+def setup_logging():
+    # logging.handlers alone costs more than the rest of a one-shot startup, so the
+    # rotating log is only set up for interactive sessions or when CFW_LOG is set
+    import logging.handlers
+
+    log_handler = logging.handlers.RotatingFileHandler(filename="curlframework.log", maxBytes=500000)
+    log_formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s       %(message)s")
+    log_handler.setFormatter(log_formatter)
+    logger = logging.getLogger()
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(log_handler)
 
 
 def curlframework(argv):
+    if argv[1:2] in (["-h"], ["--help"]):
+        from interpreter import USAGE
+
+        print(USAGE.format(argv[0]))
+        return 0
+
+    from interpreter.CurlyInterpreter import CurlyInterpreter
+
     cfw = CurlyInterpreter()
     if len(argv[1:]):
-        cfw.nonInteractive(argv)
-    else:
-        cfw.start()
+        if os.getenv("CFW_LOG"):
+            setup_logging()
+        return cfw.nonInteractive(argv)
+    setup_logging()
+    cfw.start()
+    return 0
 
 
 if __name__ == "__main__":
     try:
-        curlframework(sys.argv)
+        status = curlframework(sys.argv)
     except (KeyboardInterrupt, SystemExit):
-        pass
+        status = 0
+    sys.exit(status)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+# Compare two benchmarks/run.py result files
+#
+#   python benchmarks/compare.py before.json after.json [--threshold 10]
+#
+# Exits with status 1 when any benchmark got slower by more than threshold percent.
+
+import argparse
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before = json.load(before_file)
+        after = json.load(after_file)
+
+    print("{:<24} {:>14} {:>14} {:>9}   ({} -> {})".format(
+        "benchmark", "before ns/op", "after ns/op", "change", before.get("revision", "?"), after.get("revision", "?")))
+
+    regressions = []
+    for name in sorted(set(before["results"]) | set(after["results"])):
+        old = before["results"].get(name, {}).get("ns_per_op")
+        new = after["results"].get(name, {}).get("ns_per_op")
+        if old is None or new is None:
+            print("{:<24} {:>14} {:>14}".format(name, "-" if old is None else "{:.1f}".format(old),
+                                                "-" if new is None else "{:.1f}".format(new)))
+            continue
+        change = (new - old) / old * 100.0 if old else 0.0
+        marker = ""
+        if change > args.threshold:
+            marker = "  SLOWER"
+            regressions.append(name)
+        elif change < -args.threshold:
+            marker = "  faster"
+        print("{:<24} {:>14.1f} {:>14.1f} {:>+8.1f}%{}".format(name, old, new, change, marker))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+# Memory cost of independently configured Request instances
+# Creates --instances Request objects, bare and with their own host, path and header,
+# and reports the bytes tracemalloc attributes to each one. Fails when a configured
+# instance costs more than --max-bytes.
+#
+#   python benchmarks/memory.py --instances 100000 --max-bytes 2048 --json memory.json
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from core.modules.request import Request  # noqa: E402
+
+
+def bare(index: int) -> Request:
+    return Request()
+
+
+def configured(index: int) -> Request:
+    request = Request()
+    request.host = "host-{}.example.com".format(index)
+    request.path = "/items/{}".format(index)
+    request.keep_alive = "false"
+    request.headers["X-Request"] = str(index)
+    return request
+
+
+def bytes_per_instance(factory, instances: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [factory(index) for index in range(instances)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    isolated = len(set(id(request._option_values) for request in kept)) == instances
+    if not isolated:
+        raise RuntimeError("Request instances share option storage")
+    if hasattr(kept[0], "__dict__"):
+        raise RuntimeError("Request instances have a __dict__, a subclass is missing __slots__")
+    # The list holding the instances is not part of their cost
+    return (after - before - sys.getsizeof(kept)) / float(instances)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Request instance memory benchmark")
+    parser.add_argument("--instances", type=int, default=10000)
+    parser.add_argument("--max-bytes", type=float, default=None,
+                        help="Fail when a configured instance costs more than this")
+    parser.add_argument("--json", default=None, help="Write machine readable results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, factory in (("bare", bare), ("configured", configured)):
+        results[name] = bytes_per_instance(factory, args.instances)
+        print("{:<12} {:>10.1f} bytes/instance over {} instances".format(name, results[name], args.instances))
+
+    failures = []
+    if args.max_bytes is not None and results["configured"] > args.max_bytes:
+        failures.append("configured instance costs {:.1f} bytes, budget {:.1f}".format(
+            results["configured"], args.max_bytes))
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({
+                "benchmark": "memory",
+                "instances": args.instances,
+                "options": len(Request._options),
+                "bytes_per_instance": results,
+            }, output, indent=2)
+
+    for failure in failures:
+        print("FAIL: " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
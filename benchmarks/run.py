@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+# Offline benchmark suite for Curly's interpreter and request hot paths
+# Every benchmark runs against in-process objects or server/Server.py on an
+# ephemeral 127.0.0.1 port, results are written as JSON so runs can be compared between commits:
+#
+#   python benchmarks/run.py --json before.json
+#   python benchmarks/run.py --json after.json
+#   python benchmarks/compare.py before.json after.json
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from core.modules.request import Request  # noqa: E402
+from core.resources import printer  # noqa: E402
+from core.resources.Option import OptString, OptList, OptInteger  # noqa: E402
+from core.resources.plan import compile_plan  # noqa: E402
+from core.resources.request import BaseRequest, RequestOptionsAggregator  # noqa: E402
+from interpreter.CurlyInterpreter import BaseInterpreter  # noqa: E402
+from server.Server import serve_in_thread  # noqa: E402
+
+BENCHMARKS = []
+
+
+def benchmark(number):
+    """ Register fn(context) as a benchmark; fn runs number operations per call """
+    def register(fn):
+        BENCHMARKS.append((fn.__name__[len("bench_"):], number, fn))
+        return fn
+    return register
+
+
+@benchmark(10000)
+def bench_parse_line(context):
+    interpreter = BaseInterpreter()
+    for _ in range(10000):
+        interpreter.parse_line("run bench get requests=1000 concurrency=10")
+
+
+@benchmark(10000)
+def bench_option_set_get(context):
+    request = Request()
+    for index in range(10000):
+        request.host = "example.com"
+        request.host
+
+
+@benchmark(10000)
+def bench_request_instance(context):
+    for index in range(10000):
+        request = Request()
+        request.host = "example.com"
+        request.headers["X-Request"] = "1"
+
+
+@benchmark(1000)
+def bench_options_aggregator(context):
+    attrs = dict(("option_{}".format(index), OptString("value")) for index in range(10))
+    attrs["headers"] = OptList("")
+    attrs["port"] = OptInteger(80)
+    for _ in range(1000):
+        RequestOptionsAggregator("BenchRequest", (BaseRequest,), dict(attrs))
+
+
+@benchmark(10000)
+def bench_compile_plan(context):
+    params = {"version": "v1", "user": "42", "item": "1337"}
+    query = {"page": "2", "sort": "name"}
+    headers = {"Accept": "application/json", "X-Trace": "bench"}
+    for _ in range(10000):
+        compile_plan("POST", "http", "localhost", "/api/{version}/users/{user}/items/{item}", params, query, headers,
+                     "payload")
+
+
+@benchmark(100000)
+def bench_plan_target(context):
+    plan = compile_plan("GET", "http", "localhost", "/api/{version}/users/{user}", {"version": "v1", "user": "${id}"},
+                        {"page": "2"}, {"Accept": "application/json", "X-User": "user-${id}"})
+    row = {"id": "42"}
+    for _ in range(100000):
+        plan.target(row)
+
+
+@benchmark(10)
+def bench_print_table(context):
+    rows = [("row{}".format(index), index, "value {}".format(index)) for index in range(10000)]
+    printer.set_synchronous(True)
+    stdout, sys.stdout = sys.stdout, io.StringIO()
+    try:
+        for _ in range(10):
+            printer.print_table(("Name", "Index", "Value"), *rows)
+    finally:
+        sys.stdout = stdout
+
+
+@benchmark(10000)
+def bench_printer_queue(context):
+    if not context.get("printer_thread"):
+        printer.PrinterThread().start()
+        context["printer_thread"] = True
+    printer.set_synchronous(False)
+    sink = io.StringIO()
+    for index in range(10000):
+        printer.print_info("Header", index, file=sink)
+    printer.printer_queue.join()
+    printer.set_synchronous(True)
+
+
+def _round_trip(context, method, number, path="/", accept_encoding=""):
+    request = Request()
+    request.host = context["host"]
+    request.scheme = "http"
+    request.path = path
+    request.payload = "x" * 512
+    request.accept_encoding = accept_encoding
+    request.engine = context["engine"]
+    plan, send = request._compile(method), request._send
+    for _ in range(number):
+        send(plan).content
+
+
+@benchmark(200)
+def bench_get_round_trip(context):
+    _round_trip(context, "GET", 200)
+
+
+@benchmark(200)
+def bench_post_round_trip(context):
+    _round_trip(context, "POST", 200)
+
+
+@benchmark(200)
+def bench_gzip_round_trip(context):
+    _round_trip(context, "GET", 200, path="/?size=65536", accept_encoding="gzip")
+
+
+def measure(fn, number, context, repeat):
+    """ Best of repeat runs, as seconds per operation """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(context)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Curly hot path benchmarks")
+    parser.add_argument("--json", default=None, help="Write machine readable results to this file")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--engine", default="requests", help="Request engine used by the round-trip benchmarks")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    printer.set_synchronous(True)
+    server = serve_in_thread()
+    context = {"host": server.host, "engine": args.engine}
+
+    results = {}
+    try:
+        for name, number, fn in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            try:
+                per_op = measure(fn, number, context, args.repeat)
+            except Exception as err:
+                results[name] = {"skipped": "{}: {}".format(type(err).__name__, err)}
+                print("{:<24} skipped ({})".format(name, results[name]["skipped"]))
+                continue
+            results[name] = {"ns_per_op": per_op * 1e9, "ops_per_sec": 1.0 / per_op if per_op else 0.0}
+            print("{:<24} {:>14.1f} ns/op {:>14.1f} ops/s".format(
+                name, results[name]["ns_per_op"], results[name]["ops_per_sec"]))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump({
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "engine": args.engine,
+                "repeat": args.repeat,
+                "results": results,
+            }, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+# Startup time benchmark for the non-interactive (script) path of Kernel.py
+# Parses `python -X importtime` output and fails when the one-shot path pulls in
+# modules that should only be loaded lazily, or when startup exceeds --max-ms.
+#
+#   python benchmarks/startup.py --runs 20 --max-ms 150 --json startup.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ONE_SHOT = """
+import sys
+sys.argv = ["Kernel.py", "-f", "-"]
+import Kernel
+from interpreter.CurlyInterpreter import CurlyInterpreter
+from core.resources.printer import set_synchronous
+set_synchronous(True)
+cfw = CurlyInterpreter()
+cfw.run_script(["use request", "set host example.com", "repeat 2 set scheme http"])
+"""
+
+LAZY_MODULES = ("readline", "requests", "urllib3", "asyncio", "concurrent.futures", "future")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """ Map of module name to (self us, cumulative us) from -X importtime output """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(self_us), int(cumulative_us))
+    return imports
+
+
+def run_once(env: dict) -> tuple:
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", ONE_SHOT], cwd=REPO_DIR, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - started
+    if proc.returncode:
+        raise RuntimeError("One-shot startup failed:\n" + proc.stderr[-2000:])
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when median startup exceeds this")
+    parser.add_argument("--json", default=None, help="Write machine readable results to this file")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    env.setdefault("CFW_INDEX_CACHE", os.path.join(tempfile.gettempdir(), "cfw_index.bench.json"))
+    run_once(env)
+
+    timings = []
+    imports = {}
+    for _ in range(args.runs):
+        elapsed, imports = run_once(env)
+        timings.append(elapsed)
+
+    median_ms = statistics.median(timings) * 1000
+    lazy_loaded = sorted(name for name in imports if name in LAZY_MODULES)
+    heaviest = sorted(imports.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+
+    print("startup: median {:.1f}ms  min {:.1f}ms  over {} runs".format(
+        median_ms, min(timings) * 1000, len(timings)))
+    print("imported modules: {}  import self time: {:.1f}ms".format(
+        len(imports), sum(self_us for self_us, _ in imports.values()) / 1000.0))
+    for name, (self_us, cumulative_us) in heaviest:
+        print("  {:>8.1f}ms  {}".format(cumulative_us / 1000.0, name))
+
+    failures = []
+    if lazy_loaded:
+        failures.append("modules that should load lazily were imported: {}".format(", ".join(lazy_loaded)))
+    if args.max_ms is not None and median_ms > args.max_ms:
+        failures.append("median startup {:.1f}ms exceeds budget {:.1f}ms".format(median_ms, args.max_ms))
+
+    if args.json:
+        with open(args.json, "w") as results:
+            json.dump({
+                "benchmark": "startup",
+                "median_ms": median_ms,
+                "min_ms": min(timings) * 1000,
+                "runs": len(timings),
+                "modules": len(imports),
+                "lazy_loaded": lazy_loaded,
+                "heaviest": [[name, cumulative_us] for name, (_, cumulative_us) in heaviest],
+            }, results, indent=2)
+
+    for failure in failures:
+        print("FAIL: " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import importlib
+
+from core.exceptions.exceptions import CurlFrameworkException
+
+ENGINES = {
+    "requests": "core.engines.requests_engine.RequestsEngine",
+    "asyncio": "core.engines.asyncio_engine.AsyncioEngine",
+    "socket": "core.engines.socket_engine.SocketEngine",
+}
+
+USER_AGENT = "curly/0.1.0"
+
+
+def build_head(method: str, host: str, path: str, headers: dict, length, keep_alive: bool = True) -> bytes:
+    """ Encode the request line and headers, length None meaning a chunked body """
+    lines = ["{} {} HTTP/1.1".format(method, path or "/")]
+    names = set(name.lower() for name in headers)
+    defaults = (
+        ("Host", host),
+        ("User-Agent", USER_AGENT),
+        ("Accept", "*/*"),
+        ("Connection", "keep-alive" if keep_alive else "close"),
+    )
+    lines.extend("{}: {}".format(name, value) for name, value in defaults if name.lower() not in names)
+    lines.extend("{}: {}".format(name, value) for name, value in headers.items())
+    if length is None:
+        if "transfer-encoding" not in names:
+            lines.append("Transfer-Encoding: chunked")
+    elif (length or method in ("POST", "PUT", "PATCH")) and "content-length" not in names:
+        lines.append("Content-Length: {}".format(length))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+_instances = {}
+
+
+def get_engine(name: str):
+    """ Return the process wide instance of the named engine, importing it on first use """
+    try:
+        return _instances[name]
+    except KeyError:
+        pass
+
+    try:
+        module_path, _, class_name = ENGINES[name].rpartition(".")
+    except KeyError:
+        raise CurlFrameworkException("Unknown engine '{}'. Available engines: {}".format(name, sorted(ENGINES)))
+
+    engine = _instances[name] = getattr(importlib.import_module(module_path), class_name)()
+    return engine
+
+
+def active_engines() -> list:
+    return list(_instances.values())
@@ -0,0 +1,387 @@
+import asyncio
+import socket
+import ssl
+import threading
+import time
+import zlib
+
+from core.engines import build_head
+from core.engines.response import Headers, Response
+from core.resources.compression import Decoder
+from core.resources.timing import Timings
+
+# asyncio.timeout arrived in Python 3.11, wait_for does the same job on older ones
+_asyncio_timeout = getattr(asyncio, "timeout", None)
+
+
+class _Connection(object):
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _BodyReader(object):
+    """ Reads one response body off a connection, handing the connection back once it is drained
+
+    gzip and deflate bodies are decompressed chunk by chunk as they are read.
+    """
+
+    def __init__(self, engine: "AsyncioEngine", key: tuple, conn: _Connection, length, chunked: bool,
+                 keep_alive: bool, timings: Timings, encoding: str = ""):
+        self.engine = engine
+        self.timings = timings
+        self.started = time.perf_counter()
+        self.key = key
+        self.conn = conn
+        self.remaining = length
+        self.chunked = chunked
+        self.chunk_left = 0
+        self.keep_alive = keep_alive
+        self.done = False
+        self.decoder = Decoder(encoding, timings)
+        self.flushed = False
+
+    def _finish(self, reusable: bool = True) -> bytes:
+        if not self.done:
+            self.done = True
+            self.timings.transfer = time.perf_counter() - self.started
+            self.engine._release(self.key, self.conn, reusable and self.keep_alive)
+        return b""
+
+    def abort(self) -> None:
+        self._finish(reusable=False)
+
+    async def read_chunk(self, size: int) -> bytes:
+        """ Next piece of the decoded body, b"" once it is complete """
+        decoder = self.decoder
+        while True:
+            data = b""
+            if not decoder.pending:
+                try:
+                    data = await self.engine._within(self._read_raw(size))
+                except (TimeoutError, asyncio.TimeoutError):
+                    self.abort()
+                    raise
+                if not data:
+                    if self.flushed:
+                        return b""
+                    self.flushed = True
+                    return decoder.flush()
+            try:
+                data = decoder.decode(data, size)
+            except zlib.error:
+                self.abort()
+                raise
+            if data:
+                return data
+
+    async def _read_raw(self, size: int) -> bytes:
+        if self.done:
+            return b""
+        reader = self.conn.reader
+
+        if self.chunked:
+            if not self.chunk_left:
+                line = await reader.readline()
+                if not line:
+                    self._finish(reusable=False)
+                    raise ConnectionError("Connection closed inside chunked body")
+                chunk_size = int(line.split(b";", 1)[0].strip(), 16)
+                if not chunk_size:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return self._finish()
+                self.chunk_left = chunk_size
+            data = await reader.read(min(size, self.chunk_left))
+            if not data:
+                self._finish(reusable=False)
+                raise ConnectionError("Connection closed inside chunked body")
+            self.chunk_left -= len(data)
+            self.timings.bytes_received += len(data)
+            if not self.chunk_left:
+                await reader.readexactly(2)
+            return data
+
+        if self.remaining is None:
+            data = await reader.read(size)
+            if not data:
+                self._finish(reusable=False)
+            self.timings.bytes_received += len(data)
+            return data
+
+        data = await reader.read(min(size, self.remaining))
+        if not data:
+            self._finish(reusable=False)
+            raise ConnectionError("Connection closed before body was complete")
+        self.remaining -= len(data)
+        self.timings.bytes_received += len(data)
+        if not self.remaining:
+            self._finish()
+        return data
+
+
+class AsyncioEngine(object):
+    """ HTTP/1.1 engine on asyncio streams with keep-alive and chunked decoding
+
+    The engine owns one event loop. Coroutines (request, Response.aread) are meant for
+    running thousands of requests concurrently on that loop; send() is the blocking
+    equivalent used by the interactive commands. pool_size bounds the number of idle
+    connections kept per host, not the number of requests in flight. timeout bounds
+    connecting plus sending the request and reading the response head, and then every
+    read of the body, like the socket timeout of the other engines.
+    """
+
+    name = "asyncio"
+    is_async = True
+
+    def __init__(self, pool_size: int = 10, keep_alive: bool = True, idle_timeout: int = 60):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.timeout = None
+        self.loop = asyncio.new_event_loop()
+        self._lock = threading.RLock()
+        self._idle = {}
+        self._counters = {}
+        self._ssl_context = None
+
+    def configure(self, pool_size: int, keep_alive: bool, idle_timeout: int, timeout: float = 0) -> None:
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout or None
+
+    async def _within(self, coro):
+        """ Await coro, raising TimeoutError once it takes longer than timeout """
+        if self.timeout is None:
+            return await coro
+        if _asyncio_timeout is None:
+            return await asyncio.wait_for(coro, self.timeout)
+        async with _asyncio_timeout(self.timeout):
+            return await coro
+
+    def run(self, coro):
+        """ Drive coro to completion on the engine loop from blocking code """
+        with self._lock:
+            return self.loop.run_until_complete(coro)
+
+    def send(self, method: str, scheme: str, host: str, path: str, headers=None, data=None,
+             stream: bool = False) -> Response:
+        """ Blocking request; the body stays on the socket until read unless stream is false """
+        response = self.run(self.request(method, scheme, host, path, headers=headers, data=data))
+        if not stream:
+            response.content
+        return response
+
+    async def request(self, method: str, scheme: str, host: str, path: str, headers=None, data=None) -> Response:
+        key = (scheme, host)
+        body = data.encode("utf-8") if isinstance(data, str) else (data or b"")
+        if isinstance(body, (bytes, bytearray)):
+            length = len(body)
+        else:
+            length = len(body) if hasattr(body, "__len__") else None
+        head = build_head(method, host, path, headers or {}, length, self.keep_alive)
+        retryable = isinstance(body, (bytes, bytearray)) or iter(body) is not body
+
+        conn, timings, status_line, header_lines = await self._within(
+            self._exchange(key, head, body, length, retryable))
+
+        version, status_code, reason = self._parse_status(status_line)
+        timings.bytes_received = len(status_line) + sum(len(line) for line in header_lines)
+        header_items = []
+        for line in header_lines[:-1]:
+            name, _, value = line.decode("latin-1").partition(":")
+            header_items.append((name.strip(), value.strip()))
+        response_headers = Headers(header_items)
+
+        keep_alive = (self.keep_alive and version == "HTTP/1.1" and
+                      response_headers.get("Connection", "").lower() != "close")
+        chunked = "chunked" in response_headers.get("Transfer-Encoding", "").lower()
+        if method == "HEAD" or status_code in (204, 304) or 100 <= status_code < 200:
+            length = 0
+        elif chunked:
+            length = None
+        elif "Content-Length" in response_headers:
+            length = int(response_headers["Content-Length"])
+        else:
+            length = None
+            keep_alive = False
+
+        reader = _BodyReader(self, key, conn, length, chunked, keep_alive, timings,
+                             response_headers.get("Content-Encoding", ""))
+        if length == 0:
+            reader._finish()
+        response = Response(status_code, reason, response_headers, reader=reader, run=self.run)
+        response.timings = timings
+        return response
+
+    async def _exchange(self, key: tuple, head: bytes, body, length, retryable: bool) -> tuple:
+        """ Send the request and read the response head: (connection, timings, status line, header lines)
+
+        A reused connection the server closed in the meantime is retried once on a new one.
+        """
+        for attempt in range(2):
+            timings = Timings()
+            conn, reused = await self._acquire(key, timings)
+            try:
+                started = time.perf_counter()
+                timings.bytes_sent = await self._write_body(conn.writer, head, body, length)
+                status_line = await conn.reader.readline()
+                if not status_line:
+                    raise ConnectionResetError("Connection closed by server")
+                timings.ttfb = time.perf_counter() - started
+                break
+            except (ConnectionError, OSError):
+                conn.close()
+                if not reused or attempt or not retryable:
+                    raise
+                self._counters[key][1] -= 1
+            except BaseException:
+                # Cancelled by the timeout, the response may still arrive on this connection
+                conn.close()
+                raise
+
+        header_lines = []
+        try:
+            while True:
+                line = await conn.reader.readline()
+                header_lines.append(line)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+        except BaseException:
+            conn.close()
+            raise
+        return conn, timings, status_line, header_lines
+
+    @staticmethod
+    async def _write_body(writer: asyncio.StreamWriter, head: bytes, body, length) -> int:
+        """ Write the request and return the bytes sent
+
+        Iterable bodies are sent chunk by chunk, chunk-encoded when length is unknown.
+        """
+        if isinstance(body, (bytes, bytearray)):
+            writer.write(head + body)
+            await writer.drain()
+            return len(head) + len(body)
+
+        sent = len(head)
+        writer.write(head)
+        for chunk in body:
+            if not chunk:
+                continue
+            if length is None:
+                framing = b"%x\r\n" % len(chunk)
+                writer.write(framing)
+                writer.write(chunk)
+                writer.write(b"\r\n")
+                sent += len(framing) + 2
+            else:
+                writer.write(chunk)
+            sent += len(chunk)
+            await writer.drain()
+        if length is None:
+            writer.write(b"0\r\n\r\n")
+            sent += 5
+        await writer.drain()
+        return sent
+
+    @staticmethod
+    def _parse_status(status_line: bytes) -> tuple:
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ConnectionError("Malformed status line: {!r}".format(status_line))
+        return parts[0], int(parts[1]), parts[2] if len(parts) > 2 else ""
+
+    async def _acquire(self, key: tuple, timings: Timings) -> tuple:
+        counters = self._counters.setdefault(key, [0, 0, 0.0])
+        counters[1] += 1
+        counters[2] = time.monotonic()
+        idle = self._idle.setdefault(key, [])
+        while idle:
+            conn = idle.pop()
+            expired = self.idle_timeout > 0 and counters[2] - conn.last_used > self.idle_timeout
+            if expired or conn.reader.at_eof():
+                conn.close()
+                continue
+            return conn, True
+
+        scheme, host = key
+        hostname, _, port = host.partition(":")
+        port = int(port) if port else (443 if scheme == "https" else 80)
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        timings.reused = False
+        started = time.perf_counter()
+        addresses = await self.loop.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+        timings.dns = time.perf_counter() - started
+
+        started = time.perf_counter()
+        sock = await self._connect(addresses)
+        timings.connect = time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection(sock=sock, ssl=ssl_context,
+                                                           server_hostname=hostname if ssl_context else None)
+        except BaseException:
+            sock.close()
+            raise
+        if ssl_context:
+            timings.tls = time.perf_counter() - started
+        counters[0] += 1
+        return _Connection(reader, writer), False
+
+    async def _connect(self, addresses: list) -> socket.socket:
+        """ Connect to the first reachable resolved address """
+        error = OSError("No addresses to connect to")
+        for family, socket_type, proto, _, address in addresses:
+            sock = socket.socket(family, socket_type, proto)
+            sock.setblocking(False)
+            try:
+                await self.loop.sock_connect(sock, address)
+            except OSError as err:
+                sock.close()
+                error = err
+                continue
+            except BaseException:
+                sock.close()
+                raise
+            return sock
+        raise error
+
+    def _release(self, key: tuple, conn: _Connection, reusable: bool) -> None:
+        idle = self._idle.setdefault(key, [])
+        if reusable and len(idle) < self.pool_size:
+            conn.last_used = time.monotonic()
+            idle.append(conn)
+        else:
+            conn.close()
+
+    def stats(self) -> list:
+        """ Rows of (host, open, idle, requests, reused, idle for) matching SessionPool.stats """
+        now = time.monotonic()
+        rows = []
+        for (scheme, host), (opened, requests, last_used) in self._counters.items():
+            rows.append((
+                "{}://{}".format(scheme, host),
+                opened,
+                len(self._idle.get((scheme, host), ())),
+                requests,
+                max(requests - opened, 0),
+                "{:.1f}s".format(now - last_used),
+            ))
+        return rows
+
+    def close(self) -> None:
+        for idle in self._idle.values():
+            for conn in idle:
+                conn.close()
+        self._idle.clear()
@@ -0,0 +1,76 @@
+import time
+
+from core.resources import timing
+from core.resources.compression import ENCODINGS, IDENTITY, Decoder
+from core.resources.pool import SESSION_POOL
+
+
+class RequestsEngine(object):
+    """ Blocking engine backed by the pooled requests sessions """
+
+    name = "requests"
+    is_async = False
+    timeout = None
+    # requests would offer br and zstd too when their packages are installed, Decoder reads neither
+    accept_encoding = ", ".join(ENCODINGS)
+
+    def configure(self, pool_size: int, keep_alive: bool, idle_timeout: int, timeout: float = 0) -> None:
+        SESSION_POOL.configure(pool_size, keep_alive, idle_timeout)
+        self.timeout = timeout or None
+
+    def send(self, method: str, scheme: str, host: str, path: str, headers=None, data=None, stream: bool = False):
+        if not any(name.lower() == "accept-encoding" for name in headers or ()):
+            headers = dict(headers or {}, **{"Accept-Encoding": self.accept_encoding})
+        with SESSION_POOL.checkout(scheme, host) as session:
+            timings = timing.current.timings = timing.Timings()
+            try:
+                r = session.request(method, scheme + "://" + host + path, headers=headers, data=data, stream=True,
+                                    timeout=self.timeout)
+            finally:
+                timing.current.timings = None
+
+            timings.ttfb = max(r.elapsed.total_seconds() - timings.dns - timings.connect - timings.tls, 0.0)
+            timings.bytes_sent = self._request_size(r.request)
+            timings.bytes_received = sum(len(name) + len(value) + 4 for name, value in r.headers.items())
+            r.timings = timings
+            if not stream:
+                started = time.perf_counter()
+                self._read_content(r, timings)
+                timings.bytes_received += timings.body_received
+                timings.transfer = time.perf_counter() - started
+        return r
+
+    @staticmethod
+    def _read_content(r, timings, chunk_size: int = 65536) -> None:
+        """ Read the body off the wire and decode it ourselves, so compressed and decoded sizes are both known
+
+        Codings Decoder does not know (br, zstd asked for in the headers) are left to urllib3.
+        """
+        coding = r.headers.get("Content-Encoding", "").strip().lower()
+        if coding and coding not in ENCODINGS + ("x-gzip", IDENTITY):
+            decoder = Decoder("", timings)
+            chunks = [decoder.decode(chunk) for chunk in r.raw.stream(chunk_size, decode_content=True)]
+            timings.body_received = r.raw.tell()
+        else:
+            decoder = Decoder(coding, timings)
+            chunks = [decoder.decode(chunk) for chunk in r.raw.stream(chunk_size, decode_content=False)]
+        chunks.append(decoder.flush())
+        r._content = b"".join(chunks)
+        r._content_consumed = True
+
+    @staticmethod
+    def _request_size(prepared) -> int:
+        size = len(prepared.method) + len(prepared.path_url) + 12
+        size += sum(len(name) + len(value) + 4 for name, value in prepared.headers.items())
+        body_length = prepared.headers.get("Content-Length")
+        if body_length is not None:
+            size += int(body_length)
+        elif isinstance(prepared.body, (bytes, str)):
+            size += len(prepared.body)
+        return size
+
+    def stats(self) -> list:
+        return SESSION_POOL.stats()
+
+    def close(self) -> None:
+        SESSION_POOL.close()
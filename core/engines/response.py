@@ -0,0 +1,107 @@
+class Headers(object):
+    """ Case insensitive, order preserving response headers """
+
+    def __init__(self, items=()):
+        self._items = list(items)
+        self._index = {}
+        for name, value in self._items:
+            key = name.lower()
+            if key in self._index:
+                self._index[key] = (self._index[key][0], self._index[key][1] + ", " + value)
+            else:
+                self._index[key] = (name, value)
+
+    def __getitem__(self, name):
+        return self._index[name.lower()][1]
+
+    def __contains__(self, name):
+        return name.lower() in self._index
+
+    def __iter__(self):
+        return iter([name for name, _ in self._index.values()])
+
+    def __len__(self):
+        return len(self._index)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def items(self):
+        return [(name, value) for name, value in self._index.values()]
+
+
+class Response(object):
+    """ Response returned by the non-requests engines
+
+    Mirrors the parts of requests.Response the Request module relies on. The body is
+    either already in memory (content) or pulled lazily from reader, whose coroutines
+    are driven by run when used from blocking code.
+    """
+
+    def __init__(self, status_code: int, reason: str, headers: Headers, content: bytes = None, reader=None,
+                 run=None):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self._content = content
+        self._reader = reader
+        self._run = run
+
+    @property
+    def encoding(self) -> str:
+        content_type = self.headers.get("Content-Type", "")
+        for param in content_type.split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip("\"'")
+        return "utf-8"
+
+    async def aread(self) -> bytes:
+        if self._content is None:
+            chunks = []
+            while True:
+                chunk = await self._reader.read_chunk(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            self._content = b"".join(chunks)
+        return self._content
+
+    async def aiter_content(self, chunk_size: int = 65536):
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        while True:
+            chunk = await self._reader.read_chunk(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._run(self.aread())
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def iter_content(self, chunk_size: int = 1):
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        while True:
+            chunk = self._run(self._reader.read_chunk(chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self) -> None:
+        if self._content is None and self._reader is not None:
+            self._reader.abort()
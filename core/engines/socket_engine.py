@@ -0,0 +1,466 @@
+import collections
+import socket
+import ssl
+import threading
+import time
+
+from core.engines import build_head
+from core.engines.response import Headers, Response
+from core.resources.compression import Decoder
+from core.resources.timing import Timings
+
+BUFFER_SIZE = 65536
+HEAD_CACHE_SIZE = 1024
+
+
+def _header(line: str) -> tuple:
+    name, _, value = line.partition(":")
+    return name.strip(), value.strip()
+
+
+class _Connection(object):
+    """ A socket and the receive buffer its responses are parsed from
+
+    Bytes between start and end are received but not parsed yet. Responses are parsed
+    straight out of buffer through memoryview slices, only the body is copied out.
+    """
+
+    __slots__ = ("sock", "buffer", "view", "start", "end", "last_used")
+
+    def __init__(self, sock: socket.socket, buffer_size: int = BUFFER_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = self.end = 0
+        self.last_used = time.monotonic()
+
+    def fill(self) -> None:
+        """ Receive more bytes, moving unparsed bytes to the front or growing the buffer when it is full """
+        if self.end == len(self.buffer):
+            pending = self.end - self.start
+            if self.start:
+                self.view[:pending] = self.view[self.start:self.end]
+            else:
+                self.view.release()
+                self.buffer.extend(bytes(len(self.buffer)))
+                self.view = memoryview(self.buffer)
+            self.start, self.end = 0, pending
+        received = self.sock.recv_into(self.view[self.end:])
+        if not received:
+            raise ConnectionResetError("Connection closed by server")
+        self.end += received
+
+    def line(self) -> int:
+        """ Offset of the next CRLF, receiving until there is one """
+        while True:
+            index = self.buffer.find(b"\r\n", self.start, self.end)
+            if index >= 0:
+                return index
+            self.fill()
+
+    def take(self, size: int) -> bytes:
+        """ Next size bytes, received straight into the body when they do not fit the buffer """
+        available = self.end - self.start
+        if available >= size:
+            data = bytes(self.view[self.start:self.start + size])
+            self.start += size
+            return data
+
+        body = bytearray(size)
+        body[:available] = self.view[self.start:self.end]
+        self.start = self.end = 0
+        view, received = memoryview(body), available
+        while received < size:
+            count = self.sock.recv_into(view[received:])
+            if not count:
+                raise ConnectionResetError("Connection closed before body was complete")
+            received += count
+        view.release()
+        return bytes(body)
+
+    def rest(self) -> bytes:
+        """ Everything until the server closes the connection """
+        chunks = [bytes(self.view[self.start:self.end])]
+        self.start = self.end = 0
+        while True:
+            chunk = self.sock.recv(BUFFER_SIZE)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class SocketEngine(object):
+    """ Minimal blocking HTTP/1.1 engine on plain sockets, built for request rate
+
+    Request heads are encoded once per distinct target and reused, responses are
+    parsed out of a per-connection receive buffer without intermediate copies and
+    bodies are read whole (stream is accepted but has no effect). pipelined() keeps
+    several requests in flight on one connection. Only fixed-size bodies can be
+    pipelined, chunked and streamed bodies are sent one request at a time. timeout
+    bounds every connect, send and receive, 0 waits forever.
+    """
+
+    name = "socket"
+    is_async = False
+
+    def __init__(self, pool_size: int = 10, keep_alive: bool = True, idle_timeout: int = 60, timeout: float = 0):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout or None
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._counters = {}
+        self._heads = {}
+        self._ssl_context = None
+        self._pipelines = []
+
+    def configure(self, pool_size: int, keep_alive: bool, idle_timeout: int, timeout: float = 0) -> None:
+        if keep_alive != self.keep_alive:
+            self._heads.clear()
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout or None
+
+    def send(self, method: str, scheme: str, host: str, path: str, headers=None, data=None,
+             stream: bool = False) -> Response:
+        key = (scheme, host)
+        body = data.encode("utf-8") if isinstance(data, str) else (data or b"")
+        head = self._head(method, host, path, headers, body)
+        retryable = isinstance(body, (bytes, bytearray)) or iter(body) is not body
+
+        for attempt in range(2):
+            timings = Timings()
+            conn, reused = self._acquire(key, timings)
+            try:
+                started = time.perf_counter()
+                timings.bytes_sent = self._write(conn.sock, head, body)
+                response, keep_alive = self._read_response(conn, method, timings, started)
+                break
+            except socket.timeout:
+                # A stalled server is not a stale pooled connection, retrying would only wait again
+                conn.close()
+                raise
+            except (ConnectionError, OSError):
+                conn.close()
+                if not reused or attempt or not retryable:
+                    raise
+
+        self._release(key, conn, keep_alive)
+        return response
+
+    def pipelined(self, method: str, scheme: str, host: str, next_request, depth: int) -> "PipelinedSender":
+        """ Callable returning one response per call, with up to depth requests in flight per thread
+
+        next_request() supplies the (path, headers, data) of every request written.
+        """
+        sender = PipelinedSender(self, method, scheme, host, next_request, depth)
+        with self._lock:
+            self._pipelines.append(sender)
+        return sender
+
+    def _head(self, method: str, host: str, path: str, headers, body) -> bytes:
+        length = len(body) if hasattr(body, "__len__") else None
+        cache_key = (method, host, path, tuple(headers.items()) if headers else (), length)
+        head = self._heads.get(cache_key)
+        if head is None:
+            if len(self._heads) >= HEAD_CACHE_SIZE:
+                self._heads.clear()
+            head = self._heads[cache_key] = build_head(method, host, path, headers or {}, length, self.keep_alive)
+        return head
+
+    @staticmethod
+    def _write(sock: socket.socket, head: bytes, body) -> int:
+        """ Send one request, returning the bytes sent; bodies of unknown length are chunk-encoded """
+        if isinstance(body, (bytes, bytearray)):
+            sock.sendall(head + body if body else head)
+            return len(head) + len(body)
+
+        sent = len(head)
+        chunked = not hasattr(body, "__len__")
+        sock.sendall(head)
+        for chunk in body:
+            if not chunk:
+                continue
+            if chunked:
+                framing = b"%x\r\n" % len(chunk)
+                sock.sendall(framing + chunk + b"\r\n")
+                sent += len(framing) + 2
+            else:
+                sock.sendall(chunk)
+            sent += len(chunk)
+        if chunked:
+            sock.sendall(b"0\r\n\r\n")
+            sent += 5
+        return sent
+
+    def _read_response(self, conn: _Connection, method: str, timings: Timings, started: float) -> tuple:
+        """ Parse the next response off conn, returning it and whether the connection can be reused """
+        buffer = conn.buffer
+        while True:
+            end = buffer.find(b"\r\n\r\n", conn.start, conn.end)
+            if end >= 0:
+                break
+            conn.fill()
+        timings.ttfb = time.perf_counter() - started
+        transfer_started = time.perf_counter()
+        lines = str(conn.view[conn.start:end], "latin-1").split("\r\n")
+        timings.bytes_received = end + 4 - conn.start
+        conn.start = end + 4
+
+        version, _, status = lines[0].partition(" ")
+        code, _, reason = status.partition(" ")
+        if not version.startswith("HTTP/") or not code.isdigit():
+            raise ConnectionError("Malformed status line: {!r}".format(lines[0]))
+        status_code = int(code)
+        headers = Headers(_header(line) for line in lines[1:])
+
+        keep_alive = (self.keep_alive and version == "HTTP/1.1" and
+                      headers.get("Connection", "").lower() != "close")
+        if method == "HEAD" or status_code in (204, 304) or 100 <= status_code < 200:
+            body = b""
+        elif "chunked" in headers.get("Transfer-Encoding", "").lower():
+            body = self._read_chunked(conn)
+        elif "Content-Length" in headers:
+            body = conn.take(int(headers["Content-Length"]))
+        else:
+            body = conn.rest()
+            keep_alive = False
+
+        timings.bytes_received += len(body)
+        encoding = headers.get("Content-Encoding")
+        if encoding:
+            decoder = Decoder(encoding, timings)
+            body = decoder.decode(body) + decoder.flush()
+        else:
+            timings.body_received = timings.body_decoded = len(body)
+        timings.transfer = time.perf_counter() - transfer_started
+
+        response = Response(status_code, reason.strip(), headers, content=body)
+        response.timings = timings
+        return response, keep_alive
+
+    @staticmethod
+    def _read_chunked(conn: _Connection) -> bytes:
+        chunks = []
+        while True:
+            index = conn.line()
+            size = int(conn.buffer[conn.start:index].split(b";", 1)[0], 16)
+            conn.start = index + 2
+            if not size:
+                while True:
+                    index = conn.line()
+                    trailer, conn.start = index != conn.start, index + 2
+                    if not trailer:
+                        return b"".join(chunks)
+            chunks.append(conn.take(size))
+            conn.start = conn.line() + 2
+
+    def _acquire(self, key: tuple, timings: Timings, requests: int = 1) -> tuple:
+        """ Pooled or new connection to key, counting requests about to be sent on it """
+        with self._lock:
+            counters = self._counters.setdefault(key, [0, 0, 0.0])
+            counters[1] += requests
+            counters[2] = time.monotonic()
+            idle = self._idle.setdefault(key, [])
+            while idle:
+                conn = idle.pop()
+                if self.idle_timeout > 0 and counters[2] - conn.last_used > self.idle_timeout:
+                    conn.close()
+                    continue
+                if conn.sock.gettimeout() != self.timeout:
+                    conn.sock.settimeout(self.timeout)
+                return conn, True
+
+        scheme, host = key
+        hostname, _, port = host.partition(":")
+        port = int(port) if port else (443 if scheme == "https" else 80)
+        timings.reused = False
+        started = time.perf_counter()
+        addresses = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+        timings.dns = time.perf_counter() - started
+
+        started = time.perf_counter()
+        sock = self._connect(addresses, self.timeout)
+        timings.connect = time.perf_counter() - started
+
+        if scheme == "https":
+            started = time.perf_counter()
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            try:
+                sock = self._ssl_context.wrap_socket(sock, server_hostname=hostname)
+            except (OSError, ssl.SSLError):
+                sock.close()
+                raise
+            timings.tls = time.perf_counter() - started
+        with self._lock:
+            counters[0] += 1
+        return _Connection(sock), False
+
+    def _count(self, key: tuple, requests: int) -> None:
+        """ Count requests sent on an already acquired connection """
+        with self._lock:
+            counters = self._counters[key]
+            counters[1] += requests
+            counters[2] = time.monotonic()
+
+    @staticmethod
+    def _connect(addresses: list, timeout: float = None) -> socket.socket:
+        """ Connect to the first reachable resolved address, timeout applying to every later socket call too """
+        error = OSError("No addresses to connect to")
+        for family, socket_type, proto, _, address in addresses:
+            sock = socket.socket(family, socket_type, proto)
+            try:
+                sock.settimeout(timeout)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.connect(address)
+            except OSError as err:
+                sock.close()
+                error = err
+                continue
+            return sock
+        raise error
+
+    def _release(self, key: tuple, conn: _Connection, reusable: bool) -> None:
+        if reusable and conn.start == conn.end:
+            conn.start = conn.end = 0
+            conn.last_used = time.monotonic()
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.pool_size:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def stats(self) -> list:
+        """ Rows of (host, open, idle, requests, reused, idle for) matching SessionPool.stats """
+        now = time.monotonic()
+        rows = []
+        for (scheme, host), (opened, requests, last_used) in self._counters.items():
+            rows.append((
+                "{}://{}".format(scheme, host),
+                opened,
+                len(self._idle.get((scheme, host), ())),
+                requests,
+                max(requests - opened, 0),
+                "{:.1f}s".format(now - last_used),
+            ))
+        return rows
+
+    def close(self) -> None:
+        with self._lock:
+            pipelines, self._pipelines = self._pipelines, []
+            idle, self._idle = self._idle, {}
+        for sender in pipelines:
+            sender.close()
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class _Pipeline(object):
+    """ One connection with requests written ahead of the responses being read """
+
+    def __init__(self, engine: SocketEngine, key: tuple, conn: _Connection):
+        self.engine = engine
+        self.key = key
+        self.conn = conn
+        self.in_flight = collections.deque()
+        self.connect_timings = None
+
+
+class PipelinedSender(object):
+    """ Sends over one pipelined connection per calling thread, see SocketEngine.pipelined
+
+    Requests are written in batches: once half of depth has been answered the
+    pipeline is topped up to depth with a single send. A call returns the oldest
+    outstanding response, so up to depth - 1 requests are still in flight when the
+    caller stops; close() reads their responses before pooling the connections.
+    """
+
+    def __init__(self, engine: SocketEngine, method: str, scheme: str, host: str, next_request, depth: int):
+        self.engine = engine
+        self.method = method
+        self.key = (scheme, host)
+        self.host = host
+        self.next_request = next_request
+        self.depth = max(depth, 1)
+        self.refill = self.depth // 2
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pipelines = []
+
+    def _pipeline(self) -> _Pipeline:
+        pipeline = getattr(self._local, "pipeline", None)
+        if pipeline is None:
+            timings = Timings()
+            conn, _ = self.engine._acquire(self.key, timings, requests=0)
+            pipeline = self._local.pipeline = _Pipeline(self.engine, self.key, conn)
+            if not timings.reused:
+                pipeline.connect_timings = timings
+            with self._lock:
+                self._pipelines.append(pipeline)
+        return pipeline
+
+    def _top_up(self, pipeline: _Pipeline) -> None:
+        batch = []
+        started = time.perf_counter()
+        requests = self.depth - len(pipeline.in_flight)
+        while len(pipeline.in_flight) < self.depth:
+            path, headers, data = self.next_request()
+            body = data.encode("utf-8") if isinstance(data, str) else (data or b"")
+            if not isinstance(body, (bytes, bytearray)):
+                raise ValueError("Only fixed-size bodies can be pipelined")
+            head = self.engine._head(self.method, self.host, path, headers, body)
+            batch.append(head)
+            if body:
+                batch.append(body)
+            timings = Timings()
+            timings.bytes_sent = len(head) + len(body)
+            pipeline.in_flight.append((timings, started))
+        pipeline.conn.sock.sendall(b"".join(batch))
+        self.engine._count(self.key, requests)
+
+    def __call__(self) -> Response:
+        pipeline = self._pipeline()
+        try:
+            if len(pipeline.in_flight) <= self.refill:
+                self._top_up(pipeline)
+            timings, started = pipeline.in_flight.popleft()
+            if pipeline.connect_timings is not None:
+                for phase in ("dns", "connect", "tls"):
+                    setattr(timings, phase, getattr(pipeline.connect_timings, phase))
+                timings.reused, pipeline.connect_timings = False, None
+            response, keep_alive = self.engine._read_response(pipeline.conn, self.method, timings, started)
+        except (ConnectionError, OSError, ValueError):
+            self._discard(pipeline)
+            raise
+        if not keep_alive:
+            self._discard(pipeline)
+        return response
+
+    def _discard(self, pipeline: _Pipeline) -> None:
+        pipeline.conn.close()
+        self._local.pipeline = None
+        with self._lock:
+            if pipeline in self._pipelines:
+                self._pipelines.remove(pipeline)
+
+    def close(self) -> None:
+        """ Drain every pipeline and hand its connection back to the engine pool """
+        with self._lock:
+            pipelines, self._pipelines = self._pipelines, []
+        for pipeline in pipelines:
+            try:
+                while pipeline.in_flight:
+                    timings, started = pipeline.in_flight.popleft()
+                    _, keep_alive = self.engine._read_response(pipeline.conn, self.method, timings, started)
+            except (ConnectionError, OSError):
+                keep_alive = False
+            self.engine._release(pipeline.key, pipeline.conn, keep_alive)
+        self._local = threading.local()
@@ -1,13 +1,18 @@
 import os
+import sys
+import threading
+import time
 
-from core.resources.Option import OptString, OptBool, OptList
-from core.resources.printer import print_error, print_info, print_status
+from core.engines import get_engine
+from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.Option import OptString, OptBool, OptList, OptInteger, OptFloat
+from core.resources.printer import print_error, print_info, print_status, print_table, printer_queue
 from core.resources.request import BaseRequest
-import requests
-import json
 
 
 class Request(BaseRequest):
+    __slots__ = ("last_timings",)
+
     __info__ = {
         "name": "Request module",
         "authors": (
@@ -22,81 +27,486 @@ class Request(BaseRequest):
     headers = OptList("")
     query_params = OptList("")
     path_params = OptList("")
+    pool_size = OptInteger(10)
+    keep_alive = OptBool(True)
+    idle_timeout = OptInteger(60)
+    timeout = OptFloat(30)
+    engine = OptString("requests", persist=False)
+    stream = OptBool(False)
+    output = OptString("", persist=False)
+    chunk_size = OptInteger(65536)
+    cache = OptBool(False)
+    cache_dir = OptString("")
+    cache_entries = OptInteger(256)
+    cache_size = OptInteger(64 * 1024 * 1024)
+    record = OptString("", persist=False)
+    data = OptString("", persist=False)
+    workers = OptInteger(1, persist=False)
+    results = OptString("", persist=False)
+    result_phases = OptBool(False)
+    accept_encoding = OptString("")
+    gzip_payload = OptBool(False)
+    pipeline = OptInteger(1)
 
     def get(self):
+        self._run("GET")
 
-        try:
-            self._assert_valid()
-            print_info("Aiming for: " + self.scheme + "://" + self.host + self.path)
-            self.path = self._forge_path_params()
-            r = requests.get(self.scheme + "://" + self.host + self.path, headers=self.headers)
-            for key in r.headers:
-                print_info(key, r.headers[key])
+    def post(self):
+        self._run("POST")
+
+    def put(self):
+        self._run("PUT")
+
+    def delete(self):
+        self._run("DELETE")
+
+    def _run(self, method):
+        plan = self._compile(method)
+        if self.data:
+            self._run_data(plan)
+            return
+        target = plan.target()
+        print_info("Aiming for: " + plan.scheme + "://" + plan.host + target[0])
+        streaming = self.stream or bool(self.output)
+        r = self._send(plan, stream=streaming, target=target)
+        for key in r.headers:
+            print_info(key, r.headers[key])
+        if streaming:
+            self._write_body(r)
+        else:
             print("Body:" + r.text)
-        except Exception as ex:
-            print_error(str(ex))
 
-    def post(self):
+    def show_timings(self):
+        if getattr(self, "last_timings", None) is None:
+            raise CurlFrameworkException("No timed request yet, run one first")
+        print_table(("Phase", "Value"), *self.last_timings.rows())
+
+    def bench(self, method="", requests=None, duration=None, concurrency="1", processes="1"):
+        from core.resources.bench import run_benchmark, run_async_benchmark
+
+        if method.upper() not in ("GET", "POST", "PUT", "DELETE"):
+            raise CurlFrameworkException("Usage: run bench <get|post|put|delete> [requests=N] [duration=seconds] "
+                                         "[concurrency=N] [processes=N|auto]")
+        plan = self._compile(method.upper())
+        requests = int(requests or 0)
+        duration = float(duration or 0)
+        concurrency = max(int(concurrency), 1)
+        processes = self._processes(processes)
+        if self.pipeline > 1 and not hasattr(self._engine(), "pipelined"):
+            raise CurlFrameworkException("Engine {} cannot pipeline requests, set engine socket".format(self.engine))
+        if not requests and not duration:
+            requests = 100
+
+        print_status("Benchmarking {} {}://{}{} with concurrency {}{}...".format(
+            method.upper(), self.scheme, self.host, self.path, concurrency, self._describe_processes(processes)))
+
+        if processes != 1:
+            self._run_processes(plan, processes, requests=requests, duration=duration, concurrency=concurrency,
+                                pipeline=self.pipeline)
+            return
+
+        engine = self._engine()
+        store = self._result_store()
+        if self.pipeline > 1:
+            send, pipelined = self._pipelined_sender(engine, plan)
+            try:
+                result = run_benchmark(send, requests=requests, duration=duration, concurrency=concurrency,
+                                       store=store)
+            finally:
+                pipelined.close()
+        elif engine.is_async:
+            send = self._load_sender(engine, plan)
+            result = run_async_benchmark(engine.run, send, requests=requests, duration=duration,
+                                         concurrency=concurrency, store=store)
+        else:
+            send = self._load_sender(engine, plan)
+            result = run_benchmark(send, requests=requests, duration=duration, concurrency=concurrency, store=store)
+        print_table(("Metric", "Value"), *result.summary())
+        self._save_results(store)
+
+    def soak(self, method="", rate=None, duration="10", profile="constant", end_rate=None, rates=None, step=None,
+             concurrency="16", processes="1"):
+        from core.resources.schedule import PROFILES, arrival_offsets, run_open_loop, run_open_loop_async
+
+        if method.upper() not in ("GET", "POST", "PUT", "DELETE") or (rate is None and rates is None):
+            raise CurlFrameworkException("Usage: run soak <get|post|put|delete> rate=N [duration=seconds] "
+                                         "[profile={}] [end_rate=N] [rates=N,N,...] [step=seconds] [concurrency=N] "
+                                         "[processes=N|auto]".format("|".join(PROFILES)))
+        plan = self._compile(method.upper())
+        rates = [float(value) for value in rates.split(",")] if rates else None
+        schedule = dict(profile=profile, rate=float(rate or 0) if rates is None else rates[0],
+                        duration=float(duration), end_rate=float(end_rate) if end_rate else None, rates=rates,
+                        step=float(step) if step else None)
+        offsets = arrival_offsets(**schedule)
+        concurrency = max(int(concurrency), 1)
+        processes = self._processes(processes)
+
+        print_status("Sending {} {}://{}{} open loop, {} profile{}...".format(
+            method.upper(), self.scheme, self.host, self.path, profile, self._describe_processes(processes)))
+
+        if processes != 1:
+            self._run_processes(plan, processes, concurrency=concurrency, schedule=schedule)
+            return
 
+        engine = self._engine()
+        send = self._load_sender(engine, plan)
+        store = self._result_store()
+        if engine.is_async:
+            result = run_open_loop_async(engine.run, send, offsets, store=store)
+        else:
+            result = run_open_loop(send, offsets, concurrency=concurrency, store=store)
+        print_table(("Metric", "Value"), *result.summary())
+        self._save_results(store)
+
+    def replay(self, log="", timing="original", workers="4"):
+        from core.resources.batch import JobResult, run_batch
+        from core.resources.record import BodyReader, read_log, split_url, timed_entries
+        from core.resources.schedule import run_open_loop, run_open_loop_async
+
+        if not log or timing not in ("original", "fast"):
+            raise CurlFrameworkException("Usage: run replay <log> [timing=original|fast] [workers=N]")
         try:
-            self._assert_valid()
-            print_info("Aiming for: " + self.scheme + "://" + self.host + self.path)
-            self.path = self._forge_path_params()
-            r = requests.post(self.scheme + "://" + self.host + self.path, headers=self.headers, data=self.payload)
-            for key in r.headers:
-                print_info(key, r.headers[key])
-            print("Body:" + r.text)
-        except Exception as ex:
-            print_error(ex)
+            workers = max(int(workers), 1)
+        except ValueError:
+            raise CurlFrameworkException("Invalid number of workers '{}'".format(workers))
 
-    def put(self):
+        bodies = BodyReader(log, self.chunk_size)
+        engine = self._engine()
+        print_status("Replaying {} {} on {} workers...".format(
+            log, "at its original timing" if timing == "original" else "as fast as possible", workers))
+
+        if timing == "fast":
+            def execute(entry):
+                started = time.perf_counter()
+                try:
+                    headers, data = bodies.request(entry)
+                    r = engine.send(entry["method"], *split_url(entry["url"]), headers=headers, data=data)
+                    size = len(r.content)
+                except Exception as ex:
+                    return JobResult(entry["url"], entry["method"], None, time.perf_counter() - started, 0,
+                                     str(ex), None)
+                return JobResult(entry["url"], entry["method"], r.status_code, time.perf_counter() - started,
+                                 size, "", None)
+
+            result = run_batch(read_log(log), execute, workers=workers)
+        else:
+            offsets, entries = timed_entries(read_log(log))
+            if engine.is_async:
+                async def send(entry):
+                    headers, data = bodies.request(entry)
+                    r = await engine.request(entry["method"], *split_url(entry["url"]), headers=headers, data=data)
+                    await r.aread()
+                    return r.status_code, r.timings
+
+                result = run_open_loop_async(engine.run, send, offsets, jobs=entries)
+            else:
+                def send(entry):
+                    headers, data = bodies.request(entry)
+                    r = engine.send(entry["method"], *split_url(entry["url"]), headers=headers, data=data)
+                    r.content
+                    return r.status_code, getattr(r, "timings", None)
+
+                result = run_open_loop(send, offsets, concurrency=workers, jobs=entries)
+        print_table(("Metric", "Value"), *result.summary())
+
+    def report(self, path=""):
+        from core.resources.results import ResultStore
+
+        path = path or self.results
+        if not path:
+            raise CurlFrameworkException("Usage: run report <results file>")
+        started = time.perf_counter()
+        store = ResultStore.load(path)
+        rows = store.summary()
+        print_table(("Metric", "Value"), *rows)
+        print_status("Summarised {} requests in {:.3f}s".format(len(store), time.perf_counter() - started))
 
+    def batch(self, manifest="", workers="4", fail_fast="false"):
+        from core.resources.batch import read_manifest, run_batch
+
+        if not manifest:
+            raise CurlFrameworkException("Usage: batch <manifest> [workers=N] [fail_fast=true]")
         try:
-            self._assert_valid()
-            print_info("Aiming for: " + self.scheme + "://" + self.host + self.path)
-            self.path = self._forge_path_params()
-            r = requests.put(self.scheme + "://" + self.host + self.path, headers=self.headers, data=self.payload)
-            for key in r.headers:
-                print_info(key, r.headers[key])
-            print("Body:" + r.text)
-        except Exception as ex:
-            print_error(str(ex))
+            workers = max(int(workers), 1)
+        except ValueError:
+            raise CurlFrameworkException("Invalid number of workers '{}'".format(workers))
 
-    def delete(self):
+        print_status("Running batch {} on {} workers...".format(manifest, workers))
+        summary = run_batch(read_manifest(manifest), self._execute_job, workers=workers, on_result=self._report_job,
+                            fail_fast=fail_fast == "true")
+        print_table(("Metric", "Value"), *summary.summary())
+
+    def _execute_job(self, job):
+        """ Send one saved template without touching the module options, so jobs can run in parallel """
+        from core.resources.batch import JobResult
+        from core.resources.plan import compile_plan
 
+        name, method = job
+        started = time.perf_counter()
         try:
-            self._assert_valid()
-            print_info("Aiming for: " + self.scheme + "://" + self.host + self.path)
-            self.path = self._forge_path_params()
-            r = requests.delete(self.scheme + "://" + self.host + self.path, headers=self.headers, data=self.payload)
-            for key in r.headers:
-                print_info(key, r.headers[key])
-            print("Body:" + r.text)
+            options = self._read_template(name)
+            option = lambda key: options.get(key, getattr(self, key))
+            plan = compile_plan(method, option("scheme"), option("host"), option("path"), option("path_params"),
+                                option("query_params"), option("headers"), option("payload"), self.chunk_size,
+                                option("accept_encoding"), option("gzip_payload") in (True, "true"))
+            path, headers = plan.target()
+            r = self._engine().send(method, plan.scheme, plan.host, path, headers=headers, data=plan.data())
+            size = len(r.content)
         except Exception as ex:
-            print_error(str(ex))
+            return JobResult(name, method, None, time.perf_counter() - started, 0, str(ex), None)
+        timings = getattr(r, "timings", None)
+        return JobResult(name, method, r.status_code, time.perf_counter() - started, size, "",
+                         timings.to_dict() if timings is not None else None)
 
+    def _compile(self, method):
+        """ Validate the options once and compile them into an immutable RequestPlan """
+        from core.resources.plan import compile_plan
 
-    def save(self, args):
-        if os.path.isfile('templates/post/' + args[0] + '.json'):
-            print_error('File with given name already exists, pick another')
+        self._assert_valid()
+        plan = compile_plan(method, self.scheme, self.host, self.path, self.path_params, self.query_params,
+                            self.headers, self.payload, self.chunk_size, self.accept_encoding, self.gzip_payload)
+        if self.data and not plan.dynamic:
+            raise CurlFrameworkException("data is set but neither path, path_params, query_params nor headers "
+                                         "use a ${column} placeholder, every row would send the same request")
+        return plan
+
+    @staticmethod
+    def _processes(value):
+        """ Worker process count, None standing for one per CPU """
+        if str(value).lower() == "auto":
+            return None
+        return max(int(value), 1)
+
+    @staticmethod
+    def _describe_processes(processes):
+        if processes == 1:
+            return ""
+        return " on {} processes".format(processes) if processes else " on one process per CPU"
+
+    def _run_processes(self, plan, processes, **load):
+        """ Spread the load over worker processes and print their merged report """
+        from core.resources.multiprocess import run_processes, worker_jobs
+
+        settings = (self.pool_size, self.keep_alive, self.idle_timeout, self.timeout)
+        jobs = worker_jobs(plan, self.engine, settings, self.data, processes, results=self.results,
+                           phases=self.result_phases, **load)
+        result = run_processes(jobs)
+        print_table(("Metric", "Value"), ("processes", len(jobs)), *result.summary())
+        if self.results:
+            print_status("Saved {} results to {} ({:.1f} MB)".format(
+                result.completed + sum(result.errors.values()), self.results, os.path.getsize(self.results) / 1e6))
+
+    def _result_store(self):
+        """ Columnar store for every request outcome when the results option names a file """
+        if not self.results:
+            return None
+        from core.resources.results import ResultStore
+
+        return ResultStore(phases=self.result_phases)
+
+    def _save_results(self, store):
+        if store is None:
             return
-        print_status("Saving template as json...")
-        with open("templates/post/" + args[0] + '.json', 'w') as outfile:
-            json.dump(self.module_attributes, outfile)
+        size = store.save(self.results)
+        print_status("Saved {} results to {} ({:.1f} MB)".format(len(store), self.results, size / 1e6))
 
-    def load(self, args):
-        if not os.path.isfile('templates/post/' + args[0] + '.json'):
-            print_error("File with given name does not exist")
+    def _load_sender(self, engine, plan):
+        """ send() for the bench and soak runners, taking the next data row per call when data is set """
+        target = self._targets(plan)
+
+        if engine.is_async:
+            async def send():
+                path, headers = target()
+                started = time.time()
+                r = await engine.request(plan.method, plan.scheme, plan.host, path, headers=headers, data=plan.data())
+                await r.aread()
+                self._record(plan, started, r, path, headers)
+                return r.status_code, r.timings
+        else:
+            def send():
+                r = self._send(plan, target=target())
+                r.content
+                return r.status_code, getattr(r, "timings", None)
+
+        return send
+
+    def _pipelined_sender(self, engine, plan):
+        """ send() for run bench keeping pipeline requests in flight on every connection, and the sender to close
+
+        Pipelined requests are not recorded, responses cannot be told apart by their target.
+        """
+        target = self._targets(plan)
+
+        def next_request():
+            path, headers = target()
+            return path, headers, plan.data()
+
+        pipelined = engine.pipelined(plan.method, plan.scheme, plan.host, next_request, self.pipeline)
+
+        def send():
+            r = pipelined()
+            return r.status_code, r.timings
+
+        return send, pipelined
+
+    def _targets(self, plan):
+        """ Callable returning the (path, headers) of the next request """
+        from core.resources.dataset import read_rows
+
+        if not self.data:
+            path, headers = plan.target()
+            return lambda: (path, headers)
+
+        rows = read_rows(self.data, loop=True)
+        lock = threading.Lock()
+
+        def next_target():
+            with lock:
+                row = next(rows)
+            return plan.target(row)
+
+        return next_target
+
+    def _run_data(self, plan):
+        """ One request per data row, in order or on a pool of workers threads """
+        from core.resources.batch import JobResult, run_batch
+        from core.resources.dataset import read_rows
+
+        engine = self._engine()
+        store = self._result_store()
+
+        def execute(row):
+            started = time.perf_counter()
+            path = plan.path
+            try:
+                path, headers = plan.target(row)
+                sent_at = time.time()
+                r = engine.send(plan.method, plan.scheme, plan.host, path, headers=headers, data=plan.data())
+                size = len(r.content)
+            except Exception as ex:
+                if store is not None:
+                    store.add(time.perf_counter() - started, type(ex).__name__)
+                return JobResult(path or row, plan.method, None, time.perf_counter() - started, 0, str(ex), None)
+            elapsed = time.perf_counter() - started
+            if store is not None:
+                store.add(elapsed, r.status_code, getattr(r, "timings", None))
+            self._record(plan, sent_at, r, path, headers)
+            return JobResult(path, plan.method, r.status_code, elapsed, size, "", None)
+
+        workers = max(self.workers, 1)
+        print_status("Sending one {} per row of {} on {} worker{}...".format(
+            plan.method, self.data, workers, "s" if workers > 1 else ""))
+        # With a result store the per-response lines are replaced by its summary
+        summary = run_batch(read_rows(self.data), execute, workers=workers,
+                            on_result=self._report_job if store is None else None)
+        print_table(("Metric", "Value"), *summary.summary())
+        if store is not None:
+            print_table(("Metric", "Value"), *store.summary())
+            self._save_results(store)
+
+    @staticmethod
+    def _report_job(result):
+        if result.error:
+            print_error("{:<7} {}: {}".format(result.method, result.name, result.error))
+        else:
+            print_info("{:<7} {} -> {} ({} bytes, {:.3f}s)".format(
+                result.method, result.name, result.status, result.size, result.elapsed))
+
+    def _engine(self):
+        engine = get_engine(self.engine)
+        engine.configure(self.pool_size, self.keep_alive, self.idle_timeout, self.timeout)
+        return engine
+
+    def _send(self, plan, stream=False, target=None):
+        path, headers = plan.target() if target is None else target
+        started = time.time()
+        if self.cache and plan.method == "GET" and not stream:
+            r = self._send_cached(plan, path, headers)
+        else:
+            r = self._engine().send(plan.method, plan.scheme, plan.host, path, headers=headers, data=plan.data(),
+                                    stream=stream)
+        self.last_timings = getattr(r, "timings", None)
+        self._record(plan, started, r, path, headers)
+        return r
+
+    def _record(self, plan, started, r, path, headers):
+        """ Append the exchange to the session log when the record option names one """
+        if not self.record:
             return
+        from core.resources.record import get_recorder
+
+        get_recorder(self.record).record(plan.method, plan.scheme + "://" + plan.host + path, headers,
+                                         None if plan.method == "GET" else plan.payload, started, r,
+                                         gzipped=plan.gzip_payload)
+
+    def _send_cached(self, plan, path, headers):
+        """ Serve fresh responses from the cache and revalidate stale ones with conditional headers """
+        from core.resources.cache import RESPONSE_CACHE
+
+        RESPONSE_CACHE.configure(self.cache_entries, self.cache_size, self.cache_dir)
+        url = plan.scheme + "://" + plan.host + path
+        entry = RESPONSE_CACHE.lookup(plan.method, url, headers)
+        if entry is not None and entry.fresh:
+            return RESPONSE_CACHE.hit(entry)
+
+        request_headers = dict(headers)
+        if entry is not None:
+            request_headers.update(entry.validators())
+        r = self._engine().send(plan.method, plan.scheme, plan.host, path, headers=request_headers, data=None)
+        if entry is not None and r.status_code == 304:
+            return RESPONSE_CACHE.revalidated(entry, r.headers)
+        RESPONSE_CACHE.store(plan.method, url, headers, r)
+        return r
+
+    def _write_body(self, r):
+        """ Copy the response body chunk by chunk to the output file or stdout without buffering it """
+        written = 0
+        try:
+            if self.output:
+                with open(self.output, "wb") as outfile:
+                    for chunk in r.iter_content(self.chunk_size):
+                        outfile.write(chunk)
+                        written += len(chunk)
+                print_status("Wrote {} bytes to {}".format(written, self.output))
+                return
+
+            printer_queue.join()
+            sys.stdout.write("Body:")
+            sys.stdout.flush()
+            for chunk in r.iter_content(self.chunk_size):
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.write(b"\n")
+            sys.stdout.buffer.flush()
+        finally:
+            r.close()
+
+    def save(self, args):
+        from core.resources.utils import template_store
+
+        print_status("Saving template...")
+        if not template_store().save("post." + args[0], self.saved_attributes):
+            raise CurlFrameworkException('Template with given name already exists, pick another')
+        return True
+
+    def _read_template(self, name):
+        from core.resources.utils import template_store
+
+        data = template_store().get("post." + name)
+        if data is None:
+            raise CurlFrameworkException("Template {} does not exist".format(name))
+        return {key: value[0] for key, value in data.items()}
+
+    def load(self, args):
+        from core.resources.utils import template_store
+
+        data = template_store().get("post." + args[0])
+        if data is None:
+            raise CurlFrameworkException("Template with given name does not exist")
         print_status("Loading template {}".format(args[0]))
-        with open("templates/post/" + args[0] + '.json') as json_file:
-            data = json.load(json_file)
-            for key in self.module_attributes:
-                for p in data:
-                    if key == p:
-                        setattr(self, key, data[p][0])
-                        self.module_attributes[key][0] = data[p][0]
-                        continue
+        for key, value in data.items():
+            # Templates saved before run options were left out may still carry them
+            if key in self._options and self._options[key].persist:
+                setattr(self, key, value[0])
         print_status("Template {} loaded successfully".format(args[0]))
 
     def _assert_valid(self):
@@ -106,11 +516,3 @@ class Request(BaseRequest):
             raise Exception("Must specify valid path")
         if self.scheme != "http" and self.scheme != "https":
             raise Exception("Must specify valid scheme: [ https | http ]")
-
-    def _forge_path_params(self):
-        url_raw = self.path
-        for param in self.path_params:
-            if url_raw.find("{"+param+"}") != -1:
-                url_raw = url_raw.replace("{"+param+"}", self.path_params[param])
-
-        return url_raw
\ No newline at end of file
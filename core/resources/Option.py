@@ -2,9 +2,19 @@ from core.exceptions.exceptions import OptionValidationError
 
 
 class Option(object):
+    """ Validating descriptor of a module option
 
-    def __init__(self, default, advanced=False):
+    Values live on the instance, in the _option_values list BaseRequest gives every
+    instance, at the index RequestOptionsAggregator assigned to the option. The
+    descriptor itself only holds the validated default, so instances share no state.
+    Options with persist false configure a run (where to record, which engine) and are
+    left out of saved templates.
+    """
+
+    def __init__(self, default, advanced=False, persist=True):
         self.label = None
+        self.index = None
+        self.persist = persist
 
         try:
             self.advanced = bool(advanced)
@@ -12,72 +22,65 @@ class Option(object):
             raise OptionValidationError("Invalid value. Cannot cast '{}' to bool".format(advanced))
 
         if default or default == 0:
-            self.__set__("", default)
-        elif isinstance(self, OptList):
-            self.value = {}
-            self.display_value = {}
+            self.default = self.validate(default)
         else:
-            self.display_value = ""
-            self.value = ""
+            self.default = self.empty()
+
+    def empty(self):
+        return ""
+
+    def validate(self, value):
+        """ Value to store for value as given by the user, raises OptionValidationError """
+        raise NotImplementedError("You have to define how the option is validated")
+
+    def display(self, value):
+        return str(value)
 
     def __get__(self, instance, owner):
-        return self.value
+        if instance is None:
+            return self
+        return instance._option_values[self.index]
+
+    def __set__(self, instance, value):
+        instance._option_values[self.index] = self.validate(value)
 
 
 class OptPort(Option):
     """ Option Port attribute """
 
-    def __set__(self, instance, value):
+    def validate(self, value):
         try:
             value = int(value)
-
-            if 0 < value <= 65535:  # max port number is 65535
-                self.display_value = str(value)
-                self.value = value
-            else:
-                raise OptionValidationError("Invalid option. Port value should be between 0 and 65536.")
         except ValueError:
             raise OptionValidationError("Invalid option. Cannot cast '{}' to integer.".format(value))
+        if 0 < value <= 65535:  # max port number is 65535
+            return value
+        raise OptionValidationError("Invalid option. Port value should be between 0 and 65536.")
 
 
 class OptBool(Option):
     """ Option Bool attribute """
 
-    def __init__(self, default, advanced=False):
+    def validate(self, value):
+        if value is True or value == "true":
+            return True
+        if value is False or value == "false":
+            return False
+        raise OptionValidationError("Invalid value. It should be true or false.")
 
-        if default:
-            self.display_value = "true"
-        else:
-            self.display_value = "false"
-
-        self.value = default
-
-        try:
-            self.advanced = bool(advanced)
-        except ValueError:
-            raise OptionValidationError("Invalid value. Cannot cast '{}' to boolean.".format(advanced))
-
-    def __set__(self, instance, value):
-        if value == "true":
-            self.value = True
-            self.display_value = value
-        elif value == "false":
-            self.value = False
-            self.display_value = value
-        else:
-            raise OptionValidationError("Invalid value. It should be true or false.")
+    def display(self, value):
+        return "true" if value else "false"
 
 
 class OptInteger(Option):
     """ Option Integer attribute """
 
-    def __set__(self, instance, value):
+    def validate(self, value):
         try:
-            self.display_value = str(value)
-            self.value = int(value)
+            return int(value)
         except ValueError:
             try:
-                self.value = int(value, 16)
+                return int(value, 16)
             except ValueError:
                 raise OptionValidationError("Invalid option. Cannot cast '{}' to integer.".format(value))
 
@@ -85,10 +88,9 @@ class OptInteger(Option):
 class OptFloat(Option):
     """ Option Float attribute """
 
-    def __set__(self, instance, value):
+    def validate(self, value):
         try:
-            self.display_value = str(value)
-            self.value = float(value)
+            return float(value)
         except ValueError:
             raise OptionValidationError("Invalid option. Cannot cast '{}' to float.".format(value))
 
@@ -96,18 +98,35 @@ class OptFloat(Option):
 class OptString(Option):
     """ Option String attribute """
 
-    def __set__(self, instance, value):
+    def validate(self, value):
         try:
-            self.value = self.display_value = str(value)
+            return str(value)
         except ValueError:
             raise OptionValidationError("Invalid option. Cannot cast '{}' to string.".format(value))
 
+    def display(self, value):
+        return value
+
 
 class OptList(Option):
+    """ Option dictionary attribute, like headers, edited in place with 'add' and 'delete' """
 
-    def __add__(self, other):
-        try:
-            self.value.extend(other)
-            self.display_value.extend(other)
-        except ValueError:
-            raise OptionValidationError("Invalid option. Cannot append '{}' to array".format(other))
+    def empty(self):
+        # Created on first access, so instances that never touch it do not pay for a dict
+        return None
+
+    def validate(self, value):
+        if not isinstance(value, dict):
+            raise OptionValidationError("Invalid option. '{}' is not a dictionary.".format(value))
+        return dict(value)
+
+    def display(self, value):
+        return value
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._option_values[self.index]
+        if value is None:
+            value = instance._option_values[self.index] = {}
+        return value
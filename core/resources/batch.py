@@ -0,0 +1,91 @@
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core.exceptions.exceptions import CurlFrameworkException, StopThreadPoolExecutor
+
+JobResult = collections.namedtuple("JobResult", ["name", "method", "status", "elapsed", "size", "error", "timings"])
+
+
+class BatchSummary(object):
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.elapsed = 0.0
+        self.stopped = False
+
+    def add(self, result: JobResult) -> None:
+        self.completed += 1
+        self.busy_time += result.elapsed
+        if result.error or result.status is None or result.status >= 400:
+            self.failed += 1
+
+    def summary(self) -> list:
+        return [
+            ("jobs", self.completed),
+            ("failed", self.failed),
+            ("wall clock", "{:.3f}s".format(self.elapsed)),
+            ("request time", "{:.3f}s".format(self.busy_time)),
+            ("parallel speedup", "{:.2f}x".format(self.busy_time / self.elapsed if self.elapsed else 0.0)),
+            ("stopped early", "yes" if self.stopped else "no"),
+        ]
+
+
+def read_manifest(path: str):
+    """ Yield (template, method) pairs from a manifest, one '<template> [method]' per line
+
+    Blank lines and lines starting with '#' are skipped, the method defaults to GET.
+    """
+    try:
+        manifest = open(path)
+    except OSError as err:
+        raise CurlFrameworkException("Cannot open manifest '{}': {}".format(path, err.strerror))
+
+    with manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, _, method = line.partition(" ")
+            yield name, (method.strip() or "GET").upper()
+
+
+def run_batch(jobs, execute, workers: int = 4, on_result=None, fail_fast: bool = False) -> BatchSummary:
+    """ Run execute(job) for every job on a bounded thread pool
+
+    Jobs are consumed lazily and at most 2 * workers are queued at once. execute must return
+    a JobResult; on_result is called with each one as soon as it finishes. With fail_fast
+    the first failing job stops the pool and cancels everything still queued.
+    """
+    summary = BatchSummary()
+    started = time.perf_counter()
+
+    def collect(done):
+        for future in done:
+            result = future.result()
+            summary.add(result)
+            if on_result is not None:
+                on_result(result)
+            if fail_fast and (result.error or result.status is None or result.status >= 400):
+                raise StopThreadPoolExecutor("Job {} {} failed".format(result.method, result.name))
+
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for job in jobs:
+                pending.add(executor.submit(execute, job))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        except (StopThreadPoolExecutor, KeyboardInterrupt):
+            summary.stopped = True
+            for future in pending:
+                future.cancel()
+
+    summary.elapsed = time.perf_counter() - started
+    return summary
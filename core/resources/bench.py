@@ -0,0 +1,264 @@
+import threading
+import time
+from array import array
+from collections import Counter
+
+from core.resources.timing import PHASES
+
+
+class Histogram(object):
+    """ HDR style log-linear latency histogram with microsecond resolution
+
+    Values below 2**precision microseconds are recorded exactly, larger values
+    land in buckets whose width never exceeds 1/2**(precision-1) of the value.
+    """
+
+    def __init__(self, precision: int = 7, highest_value: int = 3600 * 1000000):
+        self.precision = precision
+        self.sub_bucket_count = 1 << precision
+        self.half_count = self.sub_bucket_count >> 1
+        self.highest_value = highest_value
+        self.counts = array("Q", [0]) * (self._index(highest_value) + 1)
+        self.total = 0
+        self.min_value = None
+        self.max_value = 0
+        self.sum_value = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.precision
+        return shift * self.half_count + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        shift = (index - self.sub_bucket_count) // self.half_count + 1
+        return ((index - shift * self.half_count + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        value = min(max(int(seconds * 1000000), 0), self.highest_value)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum_value += value
+        self.max_value = max(self.max_value, value)
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+
+    def merge(self, other: "Histogram") -> None:
+        if other.precision != self.precision or len(other.counts) != len(self.counts):
+            raise ValueError("Cannot merge histograms with different layouts")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.sum_value += other.sum_value
+        self.max_value = max(self.max_value, other.max_value)
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+
+    def percentile(self, percent: float) -> float:
+        """ Latency in seconds at the given percentile """
+        if not self.total:
+            return 0.0
+        target = max(int(percent / 100.0 * self.total + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_value) / 1000000.0
+        return self.max_value / 1000000.0
+
+    @property
+    def mean(self) -> float:
+        return self.sum_value / self.total / 1000000.0 if self.total else 0.0
+
+
+class BenchResult(object):
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.elapsed = 0.0
+        self.phase_totals = [0.0] * len(PHASES)
+        self.bytes_received = 0
+        self.body_received = 0
+        self.body_decoded = 0
+        self.decode = 0.0
+        self.timed = 0
+
+    def add_timings(self, timings) -> None:
+        """ Accumulate the per-phase Timings of one request """
+        for index, phase in enumerate(PHASES):
+            self.phase_totals[index] += getattr(timings, phase)
+        self.bytes_received += timings.bytes_received
+        self.body_received += timings.body_received
+        self.body_decoded += timings.body_decoded
+        self.decode += timings.decode
+        self.timed += 1
+
+    @property
+    def completed(self) -> int:
+        return self.histogram.total
+
+    @property
+    def throughput(self) -> float:
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other: "BenchResult") -> None:
+        self.histogram.merge(other.histogram)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+        self.phase_totals = [mine + theirs for mine, theirs in zip(self.phase_totals, other.phase_totals)]
+        self.bytes_received += other.bytes_received
+        self.body_received += other.body_received
+        self.body_decoded += other.body_decoded
+        self.decode += other.decode
+        self.timed += other.timed
+
+    def summary(self) -> list:
+        """ Rows of (metric, value) suitable for print_table """
+        rows = [
+            ("requests", self.completed + sum(self.errors.values())),
+            ("elapsed", "{:.3f}s".format(self.elapsed)),
+            ("throughput", "{:.1f} req/s".format(self.throughput)),
+            ("errors", sum(self.errors.values())),
+        ]
+        rows.extend(("status {}".format(status), count) for status, count in sorted(self.statuses.items()))
+        rows.extend(("error {}".format(name), count) for name, count in sorted(self.errors.items()))
+        if self.completed:
+            rows.append(("min", _format_latency(self.histogram.min_value / 1000000.0)))
+            rows.append(("mean", _format_latency(self.histogram.mean)))
+            for percent in (50, 90, 99, 99.9):
+                rows.append(("p{}".format(percent), _format_latency(self.histogram.percentile(percent))))
+            rows.append(("max", _format_latency(self.histogram.max_value / 1000000.0)))
+        if self.timed:
+            for index, phase in enumerate(PHASES):
+                rows.append(("mean {}".format(phase), _format_latency(self.phase_totals[index] / self.timed)))
+            rows.append(("bytes received", self.bytes_received))
+            if self.body_decoded != self.body_received:
+                rows.append(("body on the wire", self.body_received))
+                rows.append(("body decoded", self.body_decoded))
+                rows.append(("mean decompression", _format_latency(self.decode / self.timed)))
+        return rows
+
+
+def _format_latency(seconds: float) -> str:
+    return "{:.3f}ms".format(seconds * 1000)
+
+
+def run_benchmark(send, requests: int = 0, duration: float = 0.0, concurrency: int = 1, store=None) -> BenchResult:
+    """ Call send() from concurrency threads until requests calls are made or duration seconds pass
+
+    send must perform one request and return its status code, or a (status code, Timings)
+    pair, raising on transport errors. Every request is also added to store (a ResultStore) if given.
+    """
+    if not requests and not duration:
+        raise ValueError("Either requests or duration has to be specified")
+
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.monotonic() + duration if duration else None
+    results = [BenchResult() for _ in range(concurrency)]
+
+    def claim():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        if requests:
+            with lock:
+                if issued[0] >= requests:
+                    return False
+                issued[0] += 1
+        return True
+
+    def worker(result):
+        while claim():
+            started = time.perf_counter()
+            try:
+                status = send()
+            except Exception as err:
+                result.errors[type(err).__name__] += 1
+                if store is not None:
+                    store.add(time.perf_counter() - started, type(err).__name__)
+                continue
+            elapsed = time.perf_counter() - started
+            result.histogram.record(elapsed)
+            timings = None
+            if isinstance(status, tuple):
+                status, timings = status
+                if timings is not None:
+                    result.add_timings(timings)
+            result.statuses[status] += 1
+            if store is not None:
+                store.add(elapsed, status, timings)
+
+    threads = [threading.Thread(target=worker, args=(result,), daemon=True) for result in results]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = BenchResult()
+    total.elapsed = time.perf_counter() - started
+    for result in results:
+        total.merge(result)
+    return total
+
+
+def run_async_benchmark(run, send, requests: int = 0, duration: float = 0.0, concurrency: int = 1,
+                        store=None) -> BenchResult:
+    """ Coroutine flavour of run_benchmark
+
+    send is a coroutine function; concurrency tasks share one event loop that is driven by run(coro).
+    """
+    import asyncio
+
+    if not requests and not duration:
+        raise ValueError("Either requests or duration has to be specified")
+
+    issued = [0]
+    deadline = time.monotonic() + duration if duration else None
+    results = [BenchResult() for _ in range(concurrency)]
+
+    def claim():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        if requests:
+            if issued[0] >= requests:
+                return False
+            issued[0] += 1
+        return True
+
+    async def worker(result):
+        while claim():
+            started = time.perf_counter()
+            try:
+                status = await send()
+            except Exception as err:
+                result.errors[type(err).__name__] += 1
+                if store is not None:
+                    store.add(time.perf_counter() - started, type(err).__name__)
+                continue
+            elapsed = time.perf_counter() - started
+            result.histogram.record(elapsed)
+            timings = None
+            if isinstance(status, tuple):
+                status, timings = status
+                if timings is not None:
+                    result.add_timings(timings)
+            result.statuses[status] += 1
+            if store is not None:
+                store.add(elapsed, status, timings)
+
+    async def main():
+        await asyncio.gather(*(worker(result) for result in results))
+
+    started = time.perf_counter()
+    run(main())
+
+    total = BenchResult()
+    total.elapsed = time.perf_counter() - started
+    for result in results:
+        total.merge(result)
+    return total
@@ -0,0 +1,265 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from core.engines.response import Headers, Response
+
+CACHEABLE_METHODS = ("GET", "HEAD")
+CACHEABLE_STATUSES = (200, 203, 300, 301, 410)
+# Describe the (empty) 304 body rather than the stored one, so they never update an entry
+_FRAMING_HEADERS = ("content-length", "transfer-encoding", "content-encoding")
+
+
+def _parse_cache_control(value: str) -> dict:
+    directives = {}
+    for directive in value.split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"')
+    return directives
+
+
+def _updated_headers(stored: list, update) -> list:
+    """ stored with every header of a 304 replacing the stored value of the same name, framing excepted """
+    replacements = collections.OrderedDict((name.lower(), (name, value)) for name, value in update.items()
+                                           if name.lower() not in _FRAMING_HEADERS)
+    merged = [replacements.pop(name.lower(), (name, value)) for name, value in Headers(stored).items()]
+    return merged + list(replacements.values())
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CacheEntry(object):
+
+    def __init__(self, key: str, status: int, reason: str, headers: list, vary: dict, size: int, stored_at: float,
+                 expires_at: float, body: bytes = None):
+        self.key = key
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.vary = vary
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.body = body
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> dict:
+        """ Conditional request headers for revalidating this entry """
+        headers = Headers(self.headers)
+        conditional = {}
+        if "ETag" in headers:
+            conditional["If-None-Match"] = headers["ETag"]
+        if "Last-Modified" in headers:
+            conditional["If-Modified-Since"] = headers["Last-Modified"]
+        return conditional
+
+    def to_json(self) -> dict:
+        return {
+            "key": self.key, "status": self.status, "reason": self.reason, "headers": self.headers,
+            "vary": self.vary, "size": self.size, "stored_at": self.stored_at, "expires_at": self.expires_at,
+        }
+
+
+def freshness_lifetime(headers: Headers, now: float) -> float:
+    """ Seconds a response may be served without revalidation, following RFC 7234 section 4.2 """
+    directives = _parse_cache_control(headers.get("Cache-Control", ""))
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                return max(float(directives[name]), 0.0)
+            except ValueError:
+                return 0.0
+
+    date = _http_date(headers.get("Date")) or now
+    expires = headers.get("Expires")
+    if expires is not None:
+        expires_at = _http_date(expires)
+        return max(expires_at - date, 0.0) if expires_at else 0.0
+
+    last_modified = _http_date(headers.get("Last-Modified"))
+    if last_modified is not None:
+        return max((date - last_modified) / 10.0, 0.0)
+    return 0.0
+
+
+class ResponseCache(object):
+    """ LRU response cache bounded by entry count and total body size
+
+    Keys are method + URL; the request headers named by the response's Vary header
+    must match for a hit. Bodies are kept in memory, or in directory when one is
+    configured, in which case entries also survive across processes.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, directory: str = ""):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = ""
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.counters = collections.Counter()
+        self._lock = threading.RLock()
+        self.configure(max_entries, max_bytes, directory)
+
+    def configure(self, max_entries: int, max_bytes: int, directory: str) -> None:
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            directory = os.path.expanduser(directory) if directory else ""
+            if directory != self.directory:
+                self.entries.clear()
+                self.total_bytes = 0
+                self.directory = directory
+                if directory:
+                    self._load_directory()
+            self._evict()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + suffix)
+
+    def _load_directory(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        metas = []
+        for dir_entry in os.scandir(self.directory):
+            if not dir_entry.name.endswith(".meta"):
+                continue
+            try:
+                with open(dir_entry.path) as meta_file:
+                    metas.append((dir_entry.stat().st_mtime, json.load(meta_file)))
+            except (OSError, ValueError):
+                continue
+        for _, meta in sorted(metas, key=lambda item: item[0]):
+            entry = CacheEntry(**meta)
+            self.entries[entry.key] = entry
+            self.total_bytes += entry.size
+
+    @staticmethod
+    def key(method: str, url: str) -> str:
+        return method.upper() + " " + url
+
+    def lookup(self, method: str, url: str, request_headers: dict):
+        """ Stored entry for the request, fresh or not, or None """
+        request_headers = Headers(request_headers.items())
+        with self._lock:
+            entry = self.entries.get(self.key(method, url))
+            if entry is None or any(request_headers.get(name) != value for name, value in entry.vary.items()):
+                self.counters["misses"] += 1
+                return None
+            self.entries.move_to_end(entry.key)
+            return entry
+
+    def response(self, entry: CacheEntry) -> Response:
+        body = entry.body
+        if body is None:
+            with open(self._path(entry.key, ".body"), "rb") as body_file:
+                body = body_file.read()
+        return Response(entry.status, entry.reason, Headers(entry.headers), content=body)
+
+    def hit(self, entry: CacheEntry) -> Response:
+        self.counters["hits"] += 1
+        return self.response(entry)
+
+    def revalidated(self, entry: CacheEntry, response_headers) -> Response:
+        """ Apply the headers of a 304 to the entry and serve it """
+        with self._lock:
+            self.counters["revalidations"] += 1
+            entry.headers = _updated_headers(entry.headers, response_headers)
+            merged = Headers(entry.headers)
+            now = time.time()
+            entry.stored_at = now
+            entry.expires_at = now + freshness_lifetime(merged, now)
+            if self.directory:
+                self._write_meta(entry)
+        return self.response(entry)
+
+    def store(self, method: str, url: str, request_headers: dict, response) -> bool:
+        if method.upper() not in CACHEABLE_METHODS or response.status_code not in CACHEABLE_STATUSES:
+            return False
+        headers = response.headers
+        directives = _parse_cache_control(headers.get("Cache-Control", ""))
+        vary_names = [name.strip() for name in headers.get("Vary", "").split(",") if name.strip()]
+        if "no-store" in directives or "private" in directives or "*" in vary_names:
+            return False
+
+        now = time.time()
+        lifetime = freshness_lifetime(headers, now)
+        if not lifetime and "ETag" not in headers and "Last-Modified" not in headers:
+            return False
+
+        body = response.content
+        if len(body) > self.max_bytes:
+            return False
+
+        request_headers = Headers(request_headers.items())
+        vary = dict((name, request_headers.get(name)) for name in vary_names)
+        key = self.key(method, url)
+        entry = CacheEntry(key, response.status_code, getattr(response, "reason", ""), list(headers.items()), vary,
+                           len(body), now, now + lifetime, body=None if self.directory else body)
+
+        with self._lock:
+            self._remove(key)
+            if self.directory:
+                with open(self._path(key, ".body"), "wb") as body_file:
+                    body_file.write(body)
+                self._write_meta(entry)
+            self.entries[key] = entry
+            self.total_bytes += entry.size
+            self.counters["stores"] += 1
+            self._evict()
+        return True
+
+    def _write_meta(self, entry: CacheEntry) -> None:
+        with open(self._path(entry.key, ".meta"), "w") as meta_file:
+            json.dump(entry.to_json(), meta_file)
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        if self.directory:
+            for suffix in (".meta", ".body"):
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
+
+    def _evict(self) -> None:
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+            self.counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self.entries):
+                self._remove(key)
+
+    def stats(self) -> list:
+        with self._lock:
+            return [
+                ("storage", self.directory or "memory"),
+                ("entries", "{} / {}".format(len(self.entries), self.max_entries)),
+                ("bytes", "{} / {}".format(self.total_bytes, self.max_bytes)),
+                ("hits", self.counters["hits"]),
+                ("misses", self.counters["misses"]),
+                ("revalidations", self.counters["revalidations"]),
+                ("stores", self.counters["stores"]),
+                ("evictions", self.counters["evictions"]),
+            ]
+
+
+RESPONSE_CACHE = ResponseCache()
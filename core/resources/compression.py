@@ -0,0 +1,103 @@
+import gzip
+import time
+import zlib
+
+ENCODINGS = ("gzip", "deflate")
+IDENTITY = "identity"
+
+
+class Decoder(object):
+    """ Incremental Content-Encoding decoder that accounts wire and decoded body bytes
+
+    Chunks are decompressed as they arrive and, with a limit, never expand into more than
+    limit bytes at a time, so memory stays at one chunk plus the zlib window. Bytes in and
+    out and the time spent in zlib are added to timings. Unknown or absent encodings pass
+    through unchanged and are only counted.
+    """
+
+    def __init__(self, encoding: str = "", timings=None):
+        self.encoding = (encoding or "").strip().lower()
+        self.timings = timings
+        self._zlib = None
+        self._raw_fallback = False
+        if self.encoding in ("gzip", "x-gzip"):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == "deflate":
+            self._zlib = zlib.decompressobj()
+            self._raw_fallback = True
+
+    def _count(self, wire: int, decoded: int, seconds: float = 0.0) -> None:
+        if self.timings is not None:
+            self.timings.body_received += wire
+            self.timings.body_decoded += decoded
+            self.timings.decode += seconds
+
+    @property
+    def pending(self) -> bool:
+        """ Whether input is left over from a decode() that hit its limit """
+        return self._zlib is not None and bool(self._zlib.unconsumed_tail)
+
+    def decode(self, chunk: bytes, limit: int = 0) -> bytes:
+        """ Decode the next chunk off the wire, at most limit bytes (0: all of it); see pending """
+        if self._zlib is None:
+            self._count(len(chunk), len(chunk))
+            return chunk
+
+        started = time.perf_counter()
+        try:
+            data = self._zlib.decompress(self._zlib.unconsumed_tail + chunk, limit)
+        except zlib.error:
+            # Some servers send raw deflate streams without the zlib header
+            if not self._raw_fallback:
+                raise
+            self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+            data = self._zlib.decompress(chunk, limit)
+        self._raw_fallback = False
+        self._count(len(chunk), len(data), time.perf_counter() - started)
+        return data
+
+    def flush(self) -> bytes:
+        if self._zlib is None:
+            return b""
+        started = time.perf_counter()
+        data = self._zlib.flush()
+        self._count(0, len(data), time.perf_counter() - started)
+        return data
+
+
+class GzipPayload(object):
+    """ Re-iterable gzip stream over a chunked payload (FilePayload), compressed chunk by chunk """
+
+    def __init__(self, source, level: int = 6):
+        self.source = source
+        self.level = level
+
+    def __iter__(self):
+        return gzip_chunks(self.source, self.level)
+
+
+def gzip_chunks(chunks, level: int = 6):
+    """ Gzip an iterable of byte chunks lazily """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def gzip_body(body, level: int = 6):
+    """ gzip a request body: bytes are compressed at once, re-iterable payloads lazily on every send """
+    if body is None:
+        return None
+    if isinstance(body, (bytes, bytearray)):
+        return gzip.compress(bytes(body), level, mtime=0)
+    if iter(body) is body:
+        return gzip_chunks(body, level)
+    return GzipPayload(body, level)
+
+
+def accept_encoding(value: str) -> str:
+    """ Normalise the accept_encoding option, empty meaning identity """
+    codings = [coding.strip().lower() for coding in (value or "").split(",") if coding.strip()]
+    return ", ".join(codings) if codings else IDENTITY
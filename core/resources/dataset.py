@@ -0,0 +1,46 @@
+import csv
+import json
+import os
+
+from core.exceptions.exceptions import CurlFrameworkException
+
+DATA_FORMATS = (".csv", ".jsonl", ".ndjson")
+
+
+def _json_lines(data, path: str):
+    for number, line in enumerate(data, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise CurlFrameworkException("Invalid JSON on line {} of {}".format(number, path))
+        if not isinstance(row, dict):
+            raise CurlFrameworkException("Line {} of {} is not a JSON object".format(number, path))
+        yield row
+
+
+def read_rows(path: str, loop: bool = False):
+    """ Lazily yield one dict per row of a .csv (first line names the columns) or .jsonl file
+
+    With loop the file is reopened at its end, so the rows repeat for as long as they are consumed.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in DATA_FORMATS:
+        raise CurlFrameworkException("Data file has to be one of {}, got '{}'".format(", ".join(DATA_FORMATS), path))
+
+    while True:
+        try:
+            data = open(os.path.expanduser(path), newline="", encoding="utf-8")
+        except OSError as err:
+            raise CurlFrameworkException("Cannot open data file '{}': {}".format(path, err.strerror))
+
+        rows = 0
+        with data:
+            for row in csv.DictReader(data) if extension == ".csv" else _json_lines(data, path):
+                rows += 1
+                yield row
+        if not rows:
+            raise CurlFrameworkException("Data file '{}' has no rows".format(path))
+        if not loop:
+            return
@@ -0,0 +1,115 @@
+import json
+import os
+
+INDEX_CACHE_FILE = os.getenv("CFW_INDEX_CACHE", os.path.expanduser("~/.cfw_index.json"))
+INDEX_CACHE_VERSION = 2
+
+
+def _directory_mtimes(directory: str) -> dict:
+    mtimes = {}
+    for root, dirs, _ in os.walk(directory):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        mtimes[root] = os.stat(root).st_mtime_ns
+    return mtimes
+
+
+def file_version(path: str):
+    """ mtime of path for get_mapping, None when it is gone """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class IndexCache(object):
+    """ On-disk cache of module and template indexes
+
+    Every index remembers the mtime of each directory it was built from. Adding,
+    removing or renaming a file changes the mtime of its directory, so checking an
+    index costs one stat per directory no matter how many files they hold.
+    """
+
+    def __init__(self, path: str = INDEX_CACHE_FILE):
+        self.path = path
+        self._data = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                with open(self.path) as cache_file:
+                    self._data = json.load(cache_file)
+                if self._data.get("version") != INDEX_CACHE_VERSION:
+                    raise ValueError("Stale index cache version")
+            except (OSError, ValueError):
+                self._data = {"version": INDEX_CACHE_VERSION, "indexes": {}}
+        return self._data
+
+    def _save(self) -> None:
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(tmp_path, "w") as cache_file:
+                json.dump(self._data, cache_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _is_fresh(index: dict, directory: str) -> bool:
+        if index.get("root") != directory:
+            return False
+        try:
+            return all(os.stat(path).st_mtime_ns == mtime for path, mtime in index["dirs"].items())
+        except OSError:
+            return False
+
+    def get(self, name: str, directory: str, indexer) -> list:
+        """ Return the cached entries for directory, rebuilding them with indexer(directory) when stale """
+        indexes = self._load()["indexes"]
+        index = indexes.get(name)
+        if index is not None and self._is_fresh(index, directory):
+            return list(index["entries"])
+
+        entries = indexer(directory)
+        indexes[name] = {"root": directory, "dirs": _directory_mtimes(directory), "entries": entries}
+        self._save()
+        return list(entries)
+
+    def get_mapping(self, name: str, keys: list, compute, version=None) -> dict:
+        """ Cached compute(key) for every key, computing only keys not seen before or whose version(key) changed
+
+        version is typically the mtime of the file a key was computed from, catching files
+        edited in place, which leave the mtime of their directory alone.
+        """
+        indexes = self._load()["indexes"]
+        cached = indexes.get(name, {})
+        entries, mapping, changed = {}, {}, False
+        for key in keys:
+            stamp = version(key) if version is not None else None
+            entry = cached.get(key)
+            if entry is None or entry[0] != stamp:
+                entry, changed = [stamp, compute(key)], True
+            entries[key] = entry
+            mapping[key] = entry[1]
+        if changed or len(entries) != len(cached):
+            indexes[name] = entries
+            self._save()
+        return mapping
+
+    def set_mapping(self, name: str, key: str, value, version=None) -> None:
+        self._load()["indexes"].setdefault(name, {})[key] = [version, value]
+        self._save()
+
+    def add(self, name: str, entry: str, directory: str) -> None:
+        """ Record a file written by Curly itself without rebuilding the whole index """
+        index = self._load()["indexes"].get(name)
+        if index is None or entry in index["entries"]:
+            return
+        index["entries"].append(entry)
+        try:
+            index["dirs"][directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        self._save()
+
+
+INDEX_CACHE = IndexCache()
@@ -0,0 +1,169 @@
+import collections
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from core.exceptions.exceptions import CurlFrameworkException
+
+WorkerJob = collections.namedtuple("WorkerJob", ["index", "count", "plan", "engine", "settings", "data", "requests",
+                                                 "duration", "concurrency", "schedule", "results", "phases",
+                                                 "pipeline"])
+
+START_TIMEOUT = 60
+
+_start_barrier = None
+
+
+def split(total, parts: int) -> list:
+    """ Split an integer count as evenly as possible, split a float rate exactly """
+    if isinstance(total, float):
+        return [total / parts] * parts
+    share, extra = divmod(total, parts)
+    return [share + (1 if index < extra else 0) for index in range(parts)]
+
+
+def _init_worker(barrier):
+    global _start_barrier
+    _start_barrier = barrier
+
+
+def _targets(job):
+    """ Callable returning the (path, headers) of the next request, every count-th data row from index on """
+    plan = job.plan
+    if not job.data:
+        path, headers = plan.target()
+        return lambda: (path, headers)
+
+    from core.resources.dataset import read_rows
+
+    rows = itertools.islice(read_rows(job.data, loop=True), job.index, None, job.count)
+    lock = threading.Lock()
+
+    def next_target():
+        with lock:
+            row = next(rows)
+        return plan.target(row)
+
+    return next_target
+
+
+def _run_worker(job):
+    """ Runs in a worker process: one closed or open loop run over its share of the load """
+    from core.engines import get_engine
+    from core.resources.bench import run_benchmark, run_async_benchmark
+    from core.resources.results import ResultStore
+    from core.resources.schedule import arrival_offsets, run_open_loop, run_open_loop_async
+
+    plan = job.plan
+    target = _targets(job)
+    engine = get_engine(job.engine)
+    engine.configure(*job.settings)
+
+    if job.pipeline > 1:
+        def next_request():
+            path, headers = target()
+            return path, headers, plan.data()
+
+        pipelined = engine.pipelined(plan.method, plan.scheme, plan.host, next_request, job.pipeline)
+
+        def send():
+            r = pipelined()
+            return r.status_code, r.timings
+    elif engine.is_async:
+        async def send():
+            path, headers = target()
+            r = await engine.request(plan.method, plan.scheme, plan.host, path, headers=headers, data=plan.data())
+            await r.aread()
+            return r.status_code, r.timings
+    else:
+        def send():
+            path, headers = target()
+            r = engine.send(plan.method, plan.scheme, plan.host, path, headers=headers, data=plan.data())
+            r.content
+            return r.status_code, getattr(r, "timings", None)
+
+    store = ResultStore(phases=job.phases) if job.results else None
+    _start_barrier.wait(START_TIMEOUT)
+    try:
+        if job.schedule is None:
+            if engine.is_async:
+                result = run_async_benchmark(engine.run, send, job.requests, job.duration, job.concurrency, store)
+            else:
+                result = run_benchmark(send, job.requests, job.duration, job.concurrency, store)
+        else:
+            offsets = arrival_offsets(**job.schedule)
+            if engine.is_async:
+                result = run_open_loop_async(engine.run, send, offsets, store=store)
+            else:
+                result = run_open_loop(send, offsets, concurrency=job.concurrency, store=store)
+    finally:
+        engine.close()
+    if store is not None:
+        store.save(_part_path(job))
+    return result
+
+
+def _part_path(job) -> str:
+    return "{}.{}".format(job.results, job.index)
+
+
+def run_processes(jobs: list):
+    """ Run every WorkerJob in its own process and merge their results losslessly
+
+    Workers are spawned rather than forked, so nothing but the picklable jobs crosses the
+    process boundary, and wait on a barrier so their runs start together. Histograms are
+    merged bucket by bucket, so percentiles of the merged report are as exact as a single
+    process run.
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(len(jobs))
+    try:
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=context, initializer=_init_worker,
+                                 initargs=(barrier,)) as pool:
+            results = list(pool.map(_run_worker, jobs))
+    except threading.BrokenBarrierError:
+        raise CurlFrameworkException("Worker processes did not start within {}s".format(START_TIMEOUT))
+
+    merged = results[0]
+    for result in results[1:]:
+        merged.merge(result)
+    merged.elapsed = max(result.elapsed for result in results)
+    if jobs[0].results:
+        from core.resources.results import ResultStore
+
+        parts = [_part_path(job) for job in jobs]
+        ResultStore.concat(parts, jobs[0].results)
+        for part in parts:
+            os.remove(part)
+    return merged
+
+
+def worker_jobs(plan, engine: str, settings: tuple, data: str, processes: int = None, requests: int = 0,
+                duration: float = 0.0, concurrency: int = 1, schedule: dict = None, results: str = "",
+                phases: bool = False, pipeline: int = 1) -> list:
+    """ Split requests, or the rates of schedule, across processes (default: CPU count) WorkerJobs
+
+    concurrency applies to every process. With results each worker fills a ResultStore that
+    run_processes concatenates into that file. pipeline above 1 pipelines closed loop runs,
+    the engine has to support it (SocketEngine).
+    """
+    processes = processes or os.cpu_count() or 1
+    if requests and not duration:
+        processes = min(processes, requests)
+    request_shares = split(requests, processes)
+    schedules = [None] * processes
+    if schedule is not None:
+        schedules = [dict(schedule) for _ in range(processes)]
+        for key in ("rate", "end_rate"):
+            if schedule.get(key) is not None:
+                for part, share in zip(schedules, split(float(schedule[key]), processes)):
+                    part[key] = share
+        if schedule.get("rates"):
+            for part in schedules:
+                part["rates"] = [rate / processes for rate in schedule["rates"]]
+
+    return [WorkerJob(index, processes, plan, engine, settings, data, request_shares[index], duration, concurrency,
+                      schedules[index], results, phases, pipeline)
+            for index in range(processes)]
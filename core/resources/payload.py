@@ -0,0 +1,69 @@
+import os
+import stat
+import sys
+
+from core.exceptions.exceptions import OptionValidationError
+
+
+class FilePayload(object):
+    """ Request body read from a regular file in fixed-size chunks
+
+    The size is known up front so engines send a Content-Length header. Every
+    iteration reopens the file, which lets the same payload be sent repeatedly
+    (bench, retries) while keeping memory use at one chunk.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 65536):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.length = os.path.getsize(path)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        with open(self.path, "rb") as payload_file:
+            while True:
+                chunk = payload_file.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def _iter_stream(stream, chunk_size: int):
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _iter_path(path: str, chunk_size: int):
+    with open(path, "rb") as payload_file:
+        for chunk in _iter_stream(payload_file, chunk_size):
+            yield chunk
+
+
+def open_payload(value: str, chunk_size: int = 65536):
+    """ Turn the payload option into a request body
+
+    Plain values are sent as they are. '@path' streams the file from disk, '@-' streams
+    stdin. Sources without a known size (stdin, pipes) are returned as generators, which
+    engines send with Transfer-Encoding: chunked.
+    """
+    if not value or not value.startswith("@"):
+        return value
+
+    path = value[1:]
+    if path == "-":
+        return _iter_stream(sys.stdin.buffer, chunk_size)
+
+    path = os.path.expanduser(path)
+    try:
+        mode = os.stat(path).st_mode
+    except OSError as err:
+        raise OptionValidationError("Cannot read payload file '{}': {}".format(path, err.strerror))
+
+    if stat.S_ISREG(mode):
+        return FilePayload(path, chunk_size)
+    return _iter_path(path, chunk_size)
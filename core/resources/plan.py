@@ -0,0 +1,214 @@
+import collections
+import re
+from urllib.parse import quote, urlencode
+
+from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.compression import ENCODINGS, IDENTITY, accept_encoding as _accept_encoding, gzip_body
+from core.resources.payload import FilePayload, open_payload
+
+# {name} path placeholders, matched alongside ${column} and $$ so their braces are not taken for one
+_PLACEHOLDER = re.compile(r"\$(?:\{[_a-zA-Z]\w*\}|\$)|\{([^{}]+)\}")
+_COLUMN = re.compile(r"\$(?:\{([_a-zA-Z]\w*)\}|\$)")
+
+
+def _split_path(path: str) -> list:
+    """ [text, name, text, ...] of the {name} placeholders in path, like re.split """
+    parts, position = [], 0
+    for match in _PLACEHOLDER.finditer(path):
+        if match.group(1) is not None:
+            parts += [path[position:match.start()], match.group(1)]
+            position = match.end()
+    parts.append(path[position:])
+    return parts
+
+
+def _escape(value: str) -> str:
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+class _Unbound(dict):
+    """ format_map mapping of runs without a data row, ${column} placeholders go out as they are """
+
+    def __missing__(self, key):
+        return "${" + key + "}"
+
+
+_UNBOUND = _Unbound()
+
+
+def _quote_segment(value) -> str:
+    return quote(str(value), safe="")
+
+
+class _PathRow(object):
+    """ format_map mapping of a data row whose values go into the path, quoted like any path substitution """
+
+    __slots__ = ("row",)
+
+    def __init__(self, row: dict):
+        self.row = row
+
+    def __getitem__(self, key):
+        return _quote_segment(self.row[key])
+
+
+def _format_template(value: str, literal=str):
+    """ (template, dynamic): 'user-${id}' -> ('user-{id}', True) for str.format_map
+
+    Without ${column} placeholders value comes back as it is, but for $$ turning into $.
+    literal is applied to the text around the placeholders.
+    """
+    literals, columns, position = [], [], 0
+    for match in _COLUMN.finditer(value):
+        literals.append(value[position:match.start()] + ("" if match.group(1) else "$"))
+        columns.append(match.group(1))
+        position = match.end()
+    literals.append(value[position:])
+    if not any(columns):
+        return literal("".join(literals)), False
+    parts = []
+    for text, column in zip(literals, columns + [None]):
+        parts.append(_escape(literal(text)))
+        if column:
+            parts.append("{" + column + "}")
+    return "".join(parts), True
+
+
+def _normalise_headers(headers: dict) -> collections.OrderedDict:
+    """ Strip names and values, the last of names differing only in case wins """
+    normalised = collections.OrderedDict()
+    for name, value in (headers or {}).items():
+        name = str(name).strip()
+        normalised.pop(name.lower(), None)
+        normalised[name.lower()] = (name, str(value).strip())
+    return normalised
+
+
+def _append_query(path: str, query: str) -> str:
+    if not query:
+        return path
+    return path + ("&" if "?" in path else "?") + query
+
+
+class RequestPlan(collections.namedtuple("RequestPlan", [
+        "method", "scheme", "host", "path", "path_format", "query", "dynamic_query", "headers", "dynamic_headers",
+        "body", "payload", "chunk_size", "gzip_payload"])):
+    """ Immutable, compiled form of a request module's options, built by compile_plan
+
+    Everything that does not depend on a data row is resolved once: path placeholders
+    with fixed values are folded into the path, the static part of the query string is
+    encoded, headers are normalised and the body is encoded. A plan without ${column}
+    placeholders hands out the same path and headers for every request, otherwise
+    target(row) only fills the precompiled format strings with the row values.
+    """
+
+    __slots__ = ()
+
+    @property
+    def dynamic(self) -> bool:
+        return self.path is None or bool(self.dynamic_headers)
+
+    def target(self, row: dict = None):
+        """ (path, headers) of one request, row supplying the ${column} values, kept as they are without one """
+        if not self.dynamic:
+            return self.path, dict(self.headers)
+        if row is None:
+            row = _UNBOUND
+
+        try:
+            path = self.path
+            if path is None:
+                query = self.query
+                if self.dynamic_query:
+                    encoded = urlencode([(name, value.format_map(row)) for name, value in self.dynamic_query])
+                    query = query + "&" + encoded if query else encoded
+                path = _append_query(self.path_format.format_map(row if row is _UNBOUND else _PathRow(row)), query)
+            headers = dict(self.headers)
+            for name, value in self.dynamic_headers:
+                headers[name] = value.format_map(row)
+        except KeyError as err:
+            raise CurlFrameworkException("Data row has no column {}".format(err))
+        return path, headers
+
+    def data(self):
+        """ Request body, a fresh stream for payloads that can only be read once (stdin, pipes), None for GET """
+        if self.body is not None or not self.payload or self.method == "GET":
+            return self.body
+        source = open_payload(self.payload, self.chunk_size)
+        return gzip_body(source) if self.gzip_payload else source
+
+
+def compile_plan(method: str, scheme: str, host: str, path: str, path_params: dict = None, query_params: dict = None,
+                 headers: dict = None, payload: str = "", chunk_size: int = 65536, accept_encoding: str = "",
+                 gzip_payload: bool = False) -> RequestPlan:
+    """ Compile module options into a RequestPlan
+
+    {name} placeholders in path are filled from path_params, percent-quoted as a single
+    segment, and left as they are when no value is set. path and option values containing
+    ${column} placeholders are kept as format strings, $$ standing for a literal $; column
+    values going into the path are quoted too. Without a data row placeholders are sent
+    as they are.
+    A set accept_encoding is advertised unless headers set Accept-Encoding themselves,
+    empty leaves the engine default alone. With gzip_payload the body is gzipped here once, streamed payloads
+    on every send.
+    """
+    path_params = path_params or {}
+    path_format, dynamic_path = [], False
+    for index, part in enumerate(_split_path(path or "/")):
+        if index % 2:
+            if part not in path_params:
+                path_format.append(_escape("{" + part + "}"))
+                continue
+            part, dynamic = _format_template(str(path_params[part]), _quote_segment)
+        else:
+            part, dynamic = _format_template(part)
+        path_format.append(part if dynamic else _escape(part))
+        dynamic_path = dynamic_path or dynamic
+    path_format = "".join(path_format) or "/"
+
+    static_query, dynamic_query = [], []
+    for name, value in (query_params or {}).items():
+        value, dynamic = _format_template(str(value))
+        if dynamic:
+            dynamic_query.append((name, value))
+        else:
+            static_query.append((name, value))
+    query = urlencode(static_query)
+
+    headers = _normalise_headers(headers)
+    if accept_encoding:
+        accept_encoding = _accept_encoding(accept_encoding)
+        for coding in accept_encoding.split(", "):
+            if coding not in ENCODINGS + (IDENTITY,):
+                raise CurlFrameworkException("Cannot decode '{}', accept_encoding takes {}".format(
+                    coding, ", ".join(ENCODINGS + (IDENTITY,))))
+        headers.setdefault("accept-encoding", ("Accept-Encoding", accept_encoding))
+
+    body = None
+    if method != "GET":
+        source = open_payload(payload, chunk_size)
+        if isinstance(source, str):
+            body = source.encode("utf-8")
+        elif isinstance(source, FilePayload):
+            body = source
+        else:
+            source.close()
+        if gzip_payload and (body is not None or payload):
+            body = gzip_body(body)
+            headers["content-encoding"] = ("Content-Encoding", "gzip")
+
+    static_headers, dynamic_headers = [], []
+    for name, value in headers.values():
+        value, dynamic = _format_template(value)
+        if dynamic:
+            dynamic_headers.append((name, value))
+        else:
+            static_headers.append((name, value))
+
+    full_path = None
+    if not dynamic_path and not dynamic_query:
+        full_path = _append_query(path_format.format(), query)
+
+    return RequestPlan(method, scheme, host, full_path, path_format, query, tuple(dynamic_query),
+                       tuple(static_headers), tuple(dynamic_headers), body, payload, chunk_size,
+                       gzip_payload and method != "GET")
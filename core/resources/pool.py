@@ -0,0 +1,170 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from core.resources import timing
+
+
+class _TimedConnectionMixin(object):
+    """ Splits urllib3's connection setup into DNS and TCP connect phases for timing.current """
+
+    def _new_conn(self):
+        timings = getattr(timing.current, "timings", None)
+        if timings is None:
+            return super(_TimedConnectionMixin, self)._new_conn()
+
+        dns_host = self._dns_host
+        started = time.perf_counter()
+        address = socket.getaddrinfo(dns_host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        timings.dns = time.perf_counter() - started
+        timings.reused = False
+
+        self._dns_host = address
+        started = time.perf_counter()
+        try:
+            return super(_TimedConnectionMixin, self)._new_conn()
+        finally:
+            timings.connect = time.perf_counter() - started
+            self._dns_host = dns_host
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+
+    def connect(self):
+        started = time.perf_counter()
+        super(_TimedHTTPSConnection, self).connect()
+        timings = getattr(timing.current, "timings", None)
+        if timings is not None:
+            timings.tls = max(time.perf_counter() - started - timings.dns - timings.connect, 0.0)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """ HTTPAdapter whose connections report DNS, connect and TLS durations """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class SessionPool(object):
+    """ Long lived keep-alive sessions, one per scheme/host pair
+
+    Sessions are shared by every thread sending to the same host. checkout() counts the
+    threads using a session, and only sessions nobody has checked out are reaped as idle.
+    """
+
+    def __init__(self, pool_size: int = 10, keep_alive: bool = True, idle_timeout: int = 60):
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._last_used = {}
+        self._in_use = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pool_size: int, keep_alive: bool, idle_timeout: int) -> None:
+        """ Apply new settings, dropping sessions that were built with the old pool size """
+        with self._lock:
+            if pool_size != self.pool_size or keep_alive != self.keep_alive:
+                self._close_all()
+            self.pool_size = pool_size
+            self.keep_alive = keep_alive
+            self.idle_timeout = idle_timeout
+
+    @contextmanager
+    def checkout(self, scheme: str, host: str):
+        """ The session for scheme/host, kept from the idle reaper until the block exits """
+        key = (scheme, host)
+        with self._lock:
+            self._close_idle()
+            try:
+                session = self._sessions[key]
+            except KeyError:
+                session = self._sessions[key] = self._new_session(scheme)
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            yield session
+        finally:
+            with self._lock:
+                # configure() or close() may have dropped it meanwhile
+                if self._sessions.get(key) is session:
+                    self._in_use[key] -= 1
+                    self._last_used[key] = time.monotonic()
+
+    def _new_session(self, scheme: str) -> requests.Session:
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount(scheme + "://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _close_idle(self) -> None:
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        idle = [key for key, last in self._last_used.items()
+                if not self._in_use.get(key) and now - last > self.idle_timeout]
+        for key in idle:
+            self._sessions.pop(key).close()
+            del self._last_used[key]
+            self._in_use.pop(key, None)
+
+    def _close_all(self) -> None:
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+        self._last_used.clear()
+        self._in_use.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_all()
+
+    def stats(self) -> list:
+        """ Rows of (host, open, idle, requests, reused, idle for) for every pooled connection pool """
+        rows = []
+        now = time.monotonic()
+        with self._lock:
+            for (scheme, host), session in self._sessions.items():
+                last_used = self._last_used.get((scheme, host))
+                idle_for = "-" if last_used is None else "{:.1f}s".format(now - last_used)
+                for adapter in session.adapters.values():
+                    for pool_key in adapter.poolmanager.pools.keys():
+                        pool = adapter.poolmanager.pools.get(pool_key)
+                        if pool is None:
+                            continue
+                        idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+                        rows.append((
+                            "{}://{}".format(scheme, host),
+                            pool.num_connections,
+                            idle,
+                            pool.num_requests,
+                            max(pool.num_requests - pool.num_connections, 0),
+                            idle_for,
+                        ))
+        return rows
+
+
+SESSION_POOL = SessionPool()
@@ -16,6 +16,38 @@ thread_output_stream = WeakKeyDictionary()
 
 PrintResource = collections.namedtuple("PrintResource", ["content", "sep", "end", "file", "thread"])
 
+# Upper bound of queued lines the printer thread turns into a single write
+MAX_BATCH = 1024
+
+_synchronous = False
+_write_lock = threading.Lock()
+
+
+def set_synchronous(enabled: bool) -> None:
+    """ Write output directly from the calling thread instead of going through the printer thread
+
+    Meant for non-interactive runs where nothing competes with the prompt; lines go
+    straight into the (buffered) target stream, per-thread redirection still applies.
+    """
+    global _synchronous
+    _synchronous = enabled
+
+
+def _write_batch(batch) -> None:
+    """ Join consecutive resources aimed at the same file and write each run with a single call """
+    pending = []
+    current_file = None
+    for content, sep, end, file_, thread in batch:
+        if file_ is not current_file and pending:
+            current_file.write("".join(pending))
+            current_file.flush()
+            pending = []
+        current_file = file_
+        pending.append(sep.join(map(str, content)) + end)
+    if pending:
+        current_file.write("".join(pending))
+        current_file.flush()
+
 
 class PrinterThread(threading.Thread):
     def __init__(self):
@@ -24,9 +56,17 @@ class PrinterThread(threading.Thread):
 
     def run(self):
         while True:
-            content, sep, end, file_, thread = printer_queue.get()
-            print(*content, sep=sep, end=end, file=file_)
-            printer_queue.task_done()
+            batch = [printer_queue.get()]
+            try:
+                while len(batch) < MAX_BATCH:
+                    batch.append(printer_queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                _write_batch(batch)
+            finally:
+                for _ in batch:
+                    printer_queue.task_done()
 
 
 def __cprint(*args, **kwargs):
@@ -41,6 +81,12 @@ def __cprint(*args, **kwargs):
     except IndexError:
         file_ = kwargs.get("file", sys.stdout)
 
+    if _synchronous:
+        line = sep.join(map(str, args)) + end
+        with _write_lock:
+            file_.write(line)
+        return
+
     printer_queue.put(PrintResource(content=args, sep=sep, end=end, file=file_, thread=thread))
 
 
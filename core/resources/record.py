@@ -0,0 +1,162 @@
+import atexit
+import itertools
+import json
+import threading
+from urllib.parse import urlsplit
+
+from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.compression import gzip_body
+from core.resources.payload import open_payload
+
+BODY_SUFFIX = ".body"
+
+
+class Recorder(object):
+    """ Append-only NDJSON session log, one line per request/response exchange
+
+    Request bodies are not inlined: plain payloads are appended once to a '<log>.body'
+    sidecar and referenced by [offset, length], '@file' payloads are referenced by name.
+    A payload repeated by consecutive requests (bench, soak) is stored only once.
+    Bodies sent gzipped are stored uncompressed, without their Content-Encoding header
+    and flagged "gzip" so replay compresses them again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._log = open(path, "a", encoding="utf-8")
+        self._bodies = None
+        self._last_body = None
+        self._last_ref = None
+        self.entries = 0
+
+    def _body_ref(self, payload):
+        if not payload:
+            return None
+        if payload.startswith("@"):
+            return payload
+        if payload != self._last_body:
+            if self._bodies is None:
+                self._bodies = open(self.path + BODY_SUFFIX, "ab")
+            data = payload.encode("utf-8")
+            self._bodies.seek(0, 2)
+            self._last_ref = [self._bodies.tell(), len(data)]
+            self._bodies.write(data)
+            self._bodies.flush()
+            self._last_body = payload
+        return self._last_ref
+
+    def record(self, method: str, url: str, headers: dict, payload: str, started: float, r,
+               gzipped: bool = False) -> None:
+        timings = getattr(r, "timings", None)
+        length = r.headers.get("Content-Length")
+        headers = dict(headers or {})
+        if gzipped:
+            headers = dict((name, value) for name, value in headers.items() if name.lower() != "content-encoding")
+        entry = {
+            "t": started,
+            "method": method,
+            "url": url,
+            "headers": headers,
+            "status": r.status_code,
+            "response_headers": dict(r.headers.items()),
+            "size": int(length) if length is not None else None,
+            "timings": timings.to_dict() if timings is not None else None,
+        }
+        if gzipped and payload:
+            entry["gzip"] = True
+        with self._lock:
+            entry["body"] = self._body_ref(payload)
+            self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._log.flush()
+            self.entries += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._log.close()
+            if self._bodies is not None:
+                self._bodies.close()
+
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def get_recorder(path: str) -> Recorder:
+    """ One shared recorder per log file, closed at exit """
+    with _recorders_lock:
+        recorder = _recorders.get(path)
+        if recorder is None:
+            try:
+                recorder = _recorders[path] = Recorder(path)
+            except OSError as err:
+                raise CurlFrameworkException("Cannot open session log '{}': {}".format(path, err.strerror))
+            atexit.register(recorder.close)
+        return recorder
+
+
+def read_log(path: str):
+    """ Yield log entries one at a time, never holding more than a line in memory """
+    try:
+        log = open(path, encoding="utf-8")
+    except OSError as err:
+        raise CurlFrameworkException("Cannot open session log '{}': {}".format(path, err.strerror))
+
+    with log:
+        for number, line in enumerate(log, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise CurlFrameworkException("Corrupt entry on line {} of {}".format(number, path))
+
+
+def timed_entries(entries):
+    """ Split entries into (offsets, entries) iterators, offsets relative to the first entry's send time """
+    entries = iter(entries)
+    try:
+        first = next(entries)
+    except StopIteration:
+        return iter(()), iter(())
+    entries = itertools.chain((first,), entries)
+    timed, entries = itertools.tee(entries)
+    return (entry["t"] - first["t"] for entry in timed), entries
+
+
+class BodyReader(object):
+    """ Resolves body references of a log against its sidecar file """
+
+    def __init__(self, path: str, chunk_size: int = 65536):
+        self.path = path + BODY_SUFFIX
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+
+    def read(self, ref):
+        if ref is None:
+            return None
+        if isinstance(ref, str):
+            return open_payload(ref, self.chunk_size)
+        bodies = getattr(self._local, "file", None)
+        if bodies is None:
+            bodies = self._local.file = open(self.path, "rb")
+        offset, length = ref
+        bodies.seek(offset)
+        return bodies.read(length)
+
+    def request(self, entry: dict):
+        """ (headers, body) to send again for a logged request, gzipped again when it was sent gzipped """
+        body = self.read(entry["body"])
+        if not entry.get("gzip") or body is None:
+            return entry["headers"], body
+        headers = dict(entry["headers"], **{"Content-Encoding": "gzip"})
+        return headers, gzip_body(body)
+
+
+def split_url(url: str):
+    """ 'https://host/path?q' -> ('https', 'host', '/path?q') """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return parts.scheme, parts.netloc, path
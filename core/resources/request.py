@@ -1,43 +1,75 @@
+import copy
 import os
-from itertools import chain
-from future.utils import with_metaclass, iteritems
+from collections import OrderedDict
 
 from core.resources.Option import Option
 
 
 class RequestOptionsAggregator(type):
+    """ Collects the Option descriptors of a module class and its bases, in declaration order
+
+    Every option gets its index into the per-instance _option_values list, and the class
+    gets the matching _option_defaults. An inherited option whose index does not fit the
+    new layout is copied onto the class rather than renumbered in place.
+    """
 
     def __new__(cls, name, bases, attrs):
-        try:
-            base_module_attributes = chain([base.module_attributes for base in bases])
-        except AttributeError:
-            attrs["module_attributes"] = {}
-        else:
-            attrs["module_attributes"] = {k: v for d in base_module_attributes for k, v in iteritems(d)}
-
-        for key, value in iteritems(attrs.copy()):
+        options = OrderedDict()
+        for base in bases:
+            options.update(getattr(base, "_options", {}))
+
+        for key, value in attrs.copy().items():
             if isinstance(value, Option):
                 value.label = key
-                attrs["module_attributes"].update({key: [value.display_value, value.advanced]})
+                options.pop(key, None)
+                options[key] = value
             elif key == "__info__":
                 attrs["_{}{}".format(name, key)] = value
                 del attrs[key]
-            elif key in attrs["module_attributes"]:
-                del attrs["module_attributes"][key]
+            elif key in options:
+                del options[key]
+
+        for index, (key, option) in enumerate(options.items()):
+            if option.index != index:
+                if option.index is not None:
+                    option = options[key] = attrs[key] = copy.copy(option)
+                option.index = index
 
+        attrs["_options"] = options
+        attrs["_option_defaults"] = tuple(option.default for option in options.values())
         return super(RequestOptionsAggregator, cls).__new__(cls, name, bases, attrs)
 
 
-class BaseRequest(with_metaclass(RequestOptionsAggregator, object)):
+class BaseRequest(object, metaclass=RequestOptionsAggregator):
+    __slots__ = ("_option_values",)
+
+    def __new__(cls, *args, **kwargs):
+        instance = super(BaseRequest, cls).__new__(cls)
+        instance._option_values = list(cls._option_defaults)
+        return instance
+
     @property
     def options(self):
-        return list(self.module_attributes.keys())
+        return list(self._options)
+
+    @property
+    def module_attributes(self):
+        """ {option: [display value, advanced]} of this instance, the form templates are saved in """
+        return OrderedDict((key, [option.display(getattr(self, key)), option.advanced])
+                           for key, option in self._options.items())
+
+    @property
+    def saved_attributes(self):
+        """ module_attributes without the options that are not persisted """
+        return OrderedDict((key, value) for key, value in self.module_attributes.items()
+                           if self._options[key].persist)
 
     def __str__(self):
         return self.__module__.split('.', 2).pop().replace('.', os.sep)
 
 
 class Request(BaseRequest):
+    __slots__ = ()
 
     def run(self):
         raise NotImplementedError("You have to define your own run method")
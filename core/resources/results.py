@@ -0,0 +1,248 @@
+import collections
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.timing import PHASES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"CURLYRS1"
+ALIGN = 8
+MAX_VALUE = (1 << 32) - 1
+MAX_OUTCOMES = 256
+OTHER = "other"
+PERCENTILES = (50, 90, 99, 99.9)
+
+COLUMNS = (("latency", "I"), ("outcome", "B"), ("bytes", "I"))
+PHASE_COLUMNS = tuple((phase, "I") for phase in PHASES)
+
+
+def _micros(seconds: float) -> int:
+    return min(max(int(seconds * 1000000), 0), MAX_VALUE)
+
+
+def _padding(position: int) -> int:
+    return -position % ALIGN
+
+
+def _format_micros(value: float) -> str:
+    return "{:.3f}ms".format(value / 1000.0)
+
+
+def _ranks(total: int) -> list:
+    """ Zero based nearest rank positions of PERCENTILES """
+    return [max(math.ceil(percent / 100.0 * total), 1) - 1 for percent in PERCENTILES]
+
+
+def _array_stats(latency) -> dict:
+    """ Stats of a numpy latency column, percentiles found by partitioning rather than sorting """
+    ranks = _ranks(len(latency))
+    partitioned = numpy.partition(latency, ranks)
+    return {
+        "count": len(latency),
+        "mean": float(latency.mean(dtype=numpy.float64)),
+        "min": int(latency.min()),
+        "max": int(latency.max()),
+        "percentiles": [(percent, int(partitioned[rank])) for percent, rank in zip(PERCENTILES, ranks)],
+    }
+
+
+def _counter_stats(counts: collections.Counter) -> dict:
+    """ Stats of a Counter of latency values, used when numpy is not installed """
+    total = sum(counts.values())
+    ranks, percentiles, seen = _ranks(total), [], 0
+    values = sorted(counts)
+    for value in values:
+        seen += counts[value]
+        while len(percentiles) < len(ranks) and seen > ranks[len(percentiles)]:
+            percentiles.append((PERCENTILES[len(percentiles)], value))
+    return {
+        "count": total,
+        "mean": sum(value * count for value, count in counts.items()) / total,
+        "min": values[0],
+        "max": values[-1],
+        "percentiles": percentiles,
+    }
+
+
+class ResultStore(object):
+    """ Per-request outcomes kept in columnar arrays instead of per-request objects
+
+    Every request costs 9 bytes: latency in microseconds (uint32), an outcome code
+    (uint8 index into outcomes, a status code or an error name) and bytes received
+    (uint32). With phases the five timing phases add 20 bytes. save() writes the columns
+    as they are in memory after a small JSON header, load() maps them back without
+    copying, so even runs of millions of requests reload instantly.
+    """
+
+    def __init__(self, phases: bool = False):
+        self.phases = phases
+        self.outcomes = []
+        self._codes = {}
+        self._lock = threading.Lock()
+        self.columns = collections.OrderedDict(
+            (name, array(typecode)) for name, typecode in COLUMNS + (PHASE_COLUMNS if phases else ()))
+
+    def __len__(self):
+        return len(self.columns["latency"])
+
+    def _code(self, outcome) -> int:
+        label = str(outcome)
+        code = self._codes.get(label)
+        if code is None:
+            if len(self.outcomes) == MAX_OUTCOMES - 1:
+                label = OTHER
+                code = self._codes.get(label)
+            if code is None:
+                code = self._codes[label] = len(self.outcomes)
+                self.outcomes.append(label)
+        return code
+
+    def add(self, seconds: float, outcome, timings=None) -> None:
+        """ Record one request, outcome being its status code or, for failures, the error name """
+        columns = self.columns
+        with self._lock:
+            columns["latency"].append(_micros(seconds))
+            columns["outcome"].append(self._code(outcome))
+            columns["bytes"].append(min(timings.bytes_received, MAX_VALUE) if timings is not None else 0)
+            if self.phases:
+                for phase in PHASES:
+                    columns[phase].append(_micros(getattr(timings, phase)) if timings is not None else 0)
+
+    def extend(self, other: "ResultStore") -> None:
+        """ Append every request of other, translating its outcome codes """
+        codes = [self._code(label) for label in other.outcomes]
+        for name, column in self.columns.items():
+            if name == "outcome":
+                column.extend(codes[code] for code in other.columns[name])
+            elif name in other.columns:
+                column.frombytes(other.columns[name].tobytes())
+            else:
+                column.frombytes(bytes(len(other) * column.itemsize))
+
+    def save(self, path: str) -> int:
+        """ Write the store to path, returning the file size in bytes """
+        header = json.dumps({
+            "count": len(self),
+            "byteorder": sys.byteorder,
+            "outcomes": self.outcomes,
+            "columns": [[name, getattr(column, "typecode", None) or column.format]
+                        for name, column in self.columns.items()],
+        }).encode("utf-8")
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as store:
+            store.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            store.write(bytes(_padding(store.tell())))
+            for column in self.columns.values():
+                store.write(column)
+                store.write(bytes(_padding(store.tell())))
+            size = store.tell()
+        os.replace(temporary, path)
+        return size
+
+    @classmethod
+    def load(cls, path: str) -> "ResultStore":
+        """ Map a saved store into memory, its columns become read-only memoryviews over the file """
+        try:
+            with open(path, "rb") as store:
+                mapped = mmap.mmap(store.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as err:
+            raise CurlFrameworkException("Cannot open result store '{}': {}".format(path, err))
+
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise CurlFrameworkException("'{}' is not a result store".format(path))
+        length, = struct.unpack_from("<Q", mapped, len(MAGIC))
+        position = len(MAGIC) + 8
+        header = json.loads(mapped[position:position + length].decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise CurlFrameworkException("'{}' was written on a {} endian machine".format(path, header["byteorder"]))
+
+        position += length
+        position += _padding(position)
+        store = cls(phases=any(name == PHASES[0] for name, _ in header["columns"]))
+        store.outcomes = header["outcomes"]
+        store._codes = dict((label, code) for code, label in enumerate(store.outcomes))
+        view = memoryview(mapped)
+        for name, typecode in header["columns"]:
+            size = header["count"] * array(typecode).itemsize
+            store.columns[name] = view[position:position + size].cast(typecode)
+            position += size + _padding(size)
+        return store
+
+    @classmethod
+    def concat(cls, paths: list, path: str) -> int:
+        """ Merge saved stores into one file at path, returning its size """
+        merged = None
+        for part in paths:
+            store = cls.load(part)
+            if merged is None:
+                merged = cls(phases=store.phases)
+            merged.extend(store)
+        return (merged or cls()).save(path)
+
+    def _groups(self) -> list:
+        """ [(outcome label, stats)] for every outcome seen, plus (None, stats) over all requests """
+        if numpy is not None:
+            latency = numpy.frombuffer(self.columns["latency"], dtype=numpy.uint32)
+            outcomes = numpy.frombuffer(self.columns["outcome"], dtype=numpy.uint8)
+            counts = numpy.bincount(outcomes, minlength=len(self.outcomes))
+            groups = [(None, _array_stats(latency))]
+            for code in numpy.flatnonzero(counts):
+                selected = latency if counts[code] == len(latency) else latency[outcomes == code]
+                groups.append((self.outcomes[code], _array_stats(selected)))
+            return groups
+
+        per_outcome = collections.defaultdict(collections.Counter)
+        codes = set(self.columns["outcome"][:1])
+        if codes and self.columns["outcome"].tobytes().count(bytes(codes)) == len(self):
+            per_outcome[codes.pop()] = collections.Counter(self.columns["latency"])
+        else:
+            for (code, value), count in collections.Counter(zip(self.columns["outcome"],
+                                                                self.columns["latency"])).items():
+                per_outcome[code][value] = count
+        overall = collections.Counter()
+        groups = []
+        for code, counts in per_outcome.items():
+            overall.update(counts)
+            groups.append((self.outcomes[code], _counter_stats(counts)))
+        return [(None, _counter_stats(overall))] + groups
+
+    def summary(self) -> list:
+        """ Rows of (metric, value) suitable for print_table """
+        rows = [("requests", len(self))]
+        if not len(self):
+            return rows
+
+        groups = self._groups()
+        (_, overall), outcomes = groups[0], sorted(groups[1:], key=lambda group: group[0])
+        rows.append(("errors", sum(stats["count"] for label, stats in outcomes if not label.isdigit())))
+        rows.append(("min", _format_micros(overall["min"])))
+        rows.append(("mean", _format_micros(overall["mean"])))
+        rows.extend(("p{}".format(percent), _format_micros(value)) for percent, value in overall["percentiles"])
+        rows.append(("max", _format_micros(overall["max"])))
+        for label, stats in outcomes:
+            percentiles = dict(stats["percentiles"])
+            rows.append(("status " + label if label.isdigit() else "error " + label, "{} (p50 {}, p99 {})".format(
+                stats["count"], _format_micros(percentiles[50]), _format_micros(percentiles[99]))))
+
+        rows.append(("bytes received", self._sum("bytes")))
+        if self.phases:
+            for phase in PHASES:
+                rows.append(("mean {}".format(phase), _format_micros(self._sum(phase) / len(self))))
+        return rows
+
+    def _sum(self, name: str) -> int:
+        column = self.columns[name]
+        if numpy is not None:
+            return int(numpy.frombuffer(column, dtype=numpy.uint32).sum(dtype=numpy.uint64))
+        return sum(column)
@@ -0,0 +1,231 @@
+import queue
+import random
+import threading
+import time
+
+from core.resources.bench import BenchResult, Histogram, _format_latency
+
+PROFILES = ("constant", "ramp", "step", "poisson")
+
+
+def arrival_offsets(profile: str, rate: float, duration: float, end_rate: float = None, rates=None,
+                    step: float = None):
+    """ Lazily yield intended send times, in seconds from the start of the run
+
+    constant   rate requests per second for duration seconds
+    ramp       rate changing linearly to end_rate over duration
+    step       each of rates held for step seconds
+    poisson    exponentially distributed gaps averaging rate per second
+    """
+    if profile not in PROFILES:
+        raise ValueError("Unknown profile '{}', pick one of {}".format(profile, ", ".join(PROFILES)))
+    if profile == "step":
+        if not rates or not step:
+            raise ValueError("step profile needs rates and step")
+        if min(rates) <= 0:
+            raise ValueError("rates have to be positive")
+        return _step(rates, step)
+    if rate <= 0 or (profile == "ramp" and end_rate is not None and end_rate <= 0):
+        raise ValueError("rate has to be positive")
+    if profile == "ramp":
+        return _ramp(rate, rate if end_rate is None else end_rate, duration)
+    if profile == "poisson":
+        return _poisson(rate, duration)
+    return _constant(rate, duration)
+
+
+def _constant(rate, duration):
+    for index in range(int(rate * duration)):
+        yield index / rate
+
+
+def _poisson(rate, duration):
+    offset = random.expovariate(rate)
+    while offset < duration:
+        yield offset
+        offset += random.expovariate(rate)
+
+
+def _ramp(rate, end_rate, duration):
+    offset = 0.0
+    while offset < duration:
+        yield offset
+        offset += 1.0 / (rate + (end_rate - rate) * offset / duration)
+
+
+def _step(rates, step):
+    for index, rate in enumerate(rates):
+        for offset in _constant(rate, step):
+            yield index * step + offset
+
+
+class OpenLoopResult(BenchResult):
+    """ BenchResult whose latency histogram counts from the intended send time
+
+    Measuring from when a request should have been sent instead of when it was sent keeps
+    client side queueing in the numbers, which a closed loop (coordinated omission) hides.
+    service holds the classic send-to-completion latency for comparison.
+    """
+
+    def __init__(self):
+        super(OpenLoopResult, self).__init__()
+        self.service = Histogram()
+        self.scheduled = 0
+        self.max_backlog = 0
+        self.late = 0
+        self.lag_total = 0.0
+        self.max_lag = 0.0
+
+    def record(self, intended: float, sent: float, done: float, late_threshold: float) -> None:
+        self.histogram.record(done - intended)
+        self.service.record(done - sent)
+        lag = sent - intended
+        self.lag_total += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag > late_threshold:
+            self.late += 1
+
+    def merge(self, other: "OpenLoopResult") -> None:
+        super(OpenLoopResult, self).merge(other)
+        self.service.merge(other.service)
+        self.scheduled += other.scheduled
+        self.max_backlog = max(self.max_backlog, other.max_backlog)
+        self.late += other.late
+        self.lag_total += other.lag_total
+        self.max_lag = max(self.max_lag, other.max_lag)
+
+    def summary(self) -> list:
+        rows = [("scheduled", self.scheduled)]
+        rows.extend(super(OpenLoopResult, self).summary())
+        if self.service.total:
+            for percent in (50, 99):
+                rows.append(("service p{}".format(percent), _format_latency(self.service.percentile(percent))))
+        rows.append(("max backlog", self.max_backlog))
+        rows.append(("late starts", self.late))
+        started = self.completed + sum(self.errors.values())
+        rows.append(("mean start lag", _format_latency(self.lag_total / started if started else 0.0)))
+        rows.append(("max start lag", _format_latency(self.max_lag)))
+        return rows
+
+
+def _record_outcome(result, outcome, store=None, latency=0.0):
+    status, timings = outcome, None
+    if isinstance(outcome, tuple):
+        status, timings = outcome
+        if timings is not None:
+            result.add_timings(timings)
+    result.statuses[status] += 1
+    if store is not None:
+        store.add(latency, status, timings)
+
+
+def _arrivals(offsets, jobs):
+    if jobs is None:
+        return ((offset, ()) for offset in offsets)
+    return ((offset, (job,)) for offset, job in zip(offsets, jobs))
+
+
+def run_open_loop(send, offsets, concurrency: int = 16, late_threshold: float = 0.001, jobs=None,
+                  store=None) -> OpenLoopResult:
+    """ Issue send() at the intended offsets from a pool of concurrency threads
+
+    The dispatcher never waits for responses; when every worker is busy requests queue
+    up and the queue length is reported as backlog. With jobs, each offset is paired with
+    the next job and send(job) is called instead. Every request is also added to store if given.
+    """
+    result = OpenLoopResult()
+    lock = threading.Lock()
+    pending = queue.Queue()
+
+    def worker():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            intended, args = item
+            sent = time.perf_counter()
+            try:
+                outcome = send(*args)
+            except Exception as err:
+                with lock:
+                    result.errors[type(err).__name__] += 1
+                    result.lag_total += sent - intended
+                if store is not None:
+                    store.add(time.perf_counter() - intended, type(err).__name__)
+                continue
+            done = time.perf_counter()
+            with lock:
+                result.record(intended, sent, done, late_threshold)
+                _record_outcome(result, outcome, store, done - intended)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    try:
+        for offset, args in _arrivals(offsets, jobs):
+            intended = started + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pending.put((intended, args))
+            result.scheduled += 1
+            result.max_backlog = max(result.max_backlog, pending.qsize())
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_open_loop_async(run, send, offsets, max_in_flight: int = 10000, late_threshold: float = 0.001,
+                        jobs=None, store=None) -> OpenLoopResult:
+    """ Coroutine flavour of run_open_loop, every arrival becomes a task on the engine loop
+
+    Requests only queue when max_in_flight are outstanding; the number in flight is reported as backlog.
+    """
+    import asyncio
+
+    result = OpenLoopResult()
+
+    async def one(intended, args, slots):
+        async with slots:
+            sent = time.perf_counter()
+            try:
+                outcome = await send(*args)
+            except Exception as err:
+                result.errors[type(err).__name__] += 1
+                result.lag_total += sent - intended
+                if store is not None:
+                    store.add(time.perf_counter() - intended, type(err).__name__)
+                return
+            done = time.perf_counter()
+            result.record(intended, sent, done, late_threshold)
+            _record_outcome(result, outcome, store, done - intended)
+
+    async def main():
+        slots = asyncio.Semaphore(max_in_flight)
+        in_flight = set()
+        started = time.perf_counter()
+        for offset, args in _arrivals(offsets, jobs):
+            intended = started + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(one(intended, args, slots))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            result.scheduled += 1
+            result.max_backlog = max(result.max_backlog, len(in_flight))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        return started
+
+    started = time.perf_counter()
+    run(main())
+    result.elapsed = time.perf_counter() - started
+    return result
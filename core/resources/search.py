@@ -0,0 +1,128 @@
+import json
+import os
+import re
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+_END = ""
+
+# Template options whose values are worth searching for
+SEARCHABLE_OPTIONS = ("host", "scheme", "path", "headers", "query_params", "path_params")
+
+
+def tokenize(text: str) -> set:
+    return set(token for token in _TOKEN_SPLIT.split(str(text).lower()) if token)
+
+
+class PrefixTrie(object):
+    """ Character trie answering prefix queries in time proportional to the matches """
+
+    def __init__(self, words=()):
+        self.root = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+    def _node(self, prefix: str):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def words(self, prefix: str = "") -> list:
+        node = self._node(prefix)
+        if node is None:
+            return []
+        words = []
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            for char, child in node.items():
+                if char == _END:
+                    words.append(word)
+                else:
+                    stack.append((child, word + char))
+        return words
+
+    def segments(self, prefix: str, separator: str = ".") -> set:
+        """ Completions of prefix up to and including the next separator, like shell path completion """
+        node = self._node(prefix)
+        if node is None:
+            return set()
+        matches = set()
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            for char, child in node.items():
+                if char == _END:
+                    matches.add(word)
+                elif char == separator:
+                    matches.add(word + char)
+                else:
+                    stack.append((child, word + char))
+        return matches
+
+
+class SearchIndex(object):
+    """ Inverted token index over module and template names plus template option values
+
+    Each query word matches every indexed token it is a prefix of, and a document has
+    to match all words. Token lookups go through a PrefixTrie of the vocabulary.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = PrefixTrie()
+
+    def add(self, document: str, tokens) -> None:
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = set()
+                self.vocabulary.add(token)
+            postings.add(document)
+
+    def search(self, keyword: str) -> set:
+        result = None
+        for word in tokenize(keyword):
+            matches = set()
+            for token in self.vocabulary.words(word):
+                matches.update(self.postings[token])
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result or set()
+
+
+def template_tokens(template_file: str) -> list:
+    """ Tokens of a saved template: option values such as host and path plus header names and values """
+    try:
+        with open(template_file) as json_file:
+            data = json.load(json_file)
+    except (OSError, ValueError):
+        return []
+    return sorted(option_tokens({key: value[0] for key, value in data.items()}))
+
+
+def option_tokens(options: dict) -> set:
+    tokens = set()
+    for key in SEARCHABLE_OPTIONS:
+        value = options.get(key)
+        if isinstance(value, dict):
+            for item in value.items():
+                tokens.update(tokenize(" ".join(item)))
+        elif value not in (None, ""):
+            tokens.update(tokenize(value))
+    return tokens
+
+
+def template_file(templates_directory: str, template: str) -> str:
+    """ <directory>/<package>/<name>.json of a dotted template name, dots after the package belong to the name """
+    package, _, name = template.partition(".")
+    return os.path.join(templates_directory, package, name + ".json")
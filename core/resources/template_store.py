@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+
+from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.search import template_file
+
+TEMPLATE_DB_NAME = "templates.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    name TEXT PRIMARY KEY,
+    package TEXT NOT NULL,
+    host TEXT,
+    path TEXT,
+    options TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS templates_host ON templates (host);
+CREATE INDEX IF NOT EXISTS templates_path ON templates (path);
+"""
+
+_COLUMNS = "(name, package, host, path, options, updated) VALUES (?, ?, ?, ?, ?, ?)"
+_INSERT = "INSERT INTO templates " + _COLUMNS
+_REPLACE = "INSERT OR REPLACE INTO templates " + _COLUMNS
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _value(attributes: dict, key: str):
+    value = attributes.get(key)
+    value = value[0] if isinstance(value, list) and value else value
+    return value if isinstance(value, str) and value else None
+
+
+class JsonTemplateStore(object):
+    """ The original layout: one <package>/<name>.json file of module attributes per template """
+
+    indexed = False
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def file(self, name: str) -> str:
+        return template_file(self.directory, name)
+
+    def get(self, name: str):
+        """ Module attributes of template name (dotted, like post.login), None when there is none """
+        try:
+            with open(self.file(name)) as json_file:
+                return json.load(json_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            raise CurlFrameworkException("Cannot read template {}: {}".format(name, err))
+
+    def save(self, name: str, attributes: dict) -> bool:
+        """ Write a new template, False when name is taken """
+        try:
+            with open(self.file(name), "x") as outfile:
+                json.dump(attributes, outfile)
+        except FileExistsError:
+            return False
+        except OSError as err:
+            raise CurlFrameworkException("Cannot save template {}: {}".format(name, err))
+        return True
+
+
+class SqliteTemplateStore(object):
+    """ Every template in one SQLite file, looked up by primary key instead of one file open per template
+
+    name is the primary key, host and path are indexed for find(). Saves and
+    imports run in a single transaction each. One connection is shared by all threads
+    (batch reads templates from its workers) behind a lock.
+    """
+
+    indexed = True
+
+    def __init__(self, path: str):
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._integrity_error = sqlite3.IntegrityError
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def _row(name: str, attributes: dict) -> tuple:
+        return (name, name.partition(".")[0], _value(attributes, "host"), _value(attributes, "path"),
+                json.dumps(attributes), time.time())
+
+    def get(self, name: str):
+        with self._lock:
+            row = self._db.execute("SELECT options FROM templates WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, name: str, attributes: dict) -> bool:
+        try:
+            with self._lock, self._db:
+                self._db.execute(_INSERT, self._row(name, attributes))
+        except self._integrity_error:
+            return False
+        return True
+
+    def names(self) -> list:
+        with self._lock:
+            return [name for name, in self._db.execute("SELECT name FROM templates ORDER BY name")]
+
+    def items(self):
+        """ (name, attributes) of every template """
+        with self._lock:
+            rows = self._db.execute("SELECT name, options FROM templates").fetchall()
+        return [(name, json.loads(options)) for name, options in rows]
+
+    def find(self, host: str = None, path: str = None) -> list:
+        """ Names of templates matching every given field exactly """
+        clauses, values = [], []
+        for column, value in (("host", host), ("path", path)):
+            if value is not None:
+                clauses.append("{} = ?".format(column))
+                values.append(value)
+        query = "SELECT name FROM templates" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        with self._lock:
+            return sorted(name for name, in self._db.execute(query, values))
+
+    def import_json(self, directory: str) -> int:
+        """ Copy every <package>/<name>.json below directory into the store, replacing same-named templates """
+        rows = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            package = os.path.relpath(root, directory).replace(os.sep, ".")
+            for file_name in files:
+                if not file_name.endswith(".json"):
+                    continue
+                name = os.path.splitext(file_name)[0]
+                name = name if package == "." else package + "." + name
+                try:
+                    with open(os.path.join(root, file_name)) as json_file:
+                        rows.append(self._row(name, json.load(json_file)))
+                except (OSError, ValueError) as err:
+                    raise CurlFrameworkException("Cannot import {}: {}".format(os.path.join(root, file_name), err))
+        with self._lock, self._db:
+            self._db.executemany(_REPLACE, rows)
+        return len(rows)
+
+    def export_json(self, directory: str) -> int:
+        """ Write every template as <package>/<name>.json below directory, overwriting existing files """
+        templates = self.items()
+        for name, attributes in templates:
+            path = template_file(directory, name)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w") as outfile:
+                    json.dump(attributes, outfile)
+            except OSError as err:
+                raise CurlFrameworkException("Cannot export template {}: {}".format(name, err))
+        return len(templates)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def template_db_path(directory: str) -> str:
+    return os.getenv("CFW_TEMPLATE_DB") or os.path.join(directory, TEMPLATE_DB_NAME)
+
+
+def get_template_store(directory: str):
+    """ Process wide template store for directory: SQLite once its database exists, JSON files otherwise """
+    db_path = template_db_path(directory)
+    key = (directory, db_path, os.path.exists(db_path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SqliteTemplateStore(db_path) if key[2] else JsonTemplateStore(directory)
+        return store
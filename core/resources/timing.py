@@ -0,0 +1,54 @@
+import threading
+
+PHASES = ("dns", "connect", "tls", "ttfb", "transfer")
+
+# Timings of the request the current thread is sending, filled in by connection hooks
+current = threading.local()
+
+
+class Timings(object):
+    """ Duration of each phase of one request in seconds, like curl's -w time variables
+
+    Phases are consecutive: dns, connect and tls are zero when a pooled connection was
+    reused, ttfb runs from writing the request to reading the status line and transfer
+    from there until the body was drained. body_received counts the body as it came off
+    the wire, body_decoded after Content-Encoding was undone, decode is the time spent
+    decompressing, which is part of transfer.
+    """
+
+    __slots__ = PHASES + ("bytes_sent", "bytes_received", "body_received", "body_decoded", "decode", "reused")
+
+    def __init__(self):
+        for phase in PHASES:
+            setattr(self, phase, 0.0)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.body_received = 0
+        self.body_decoded = 0
+        self.decode = 0.0
+        self.reused = True
+
+    @property
+    def total(self) -> float:
+        return sum(getattr(self, phase) for phase in PHASES)
+
+    def to_dict(self) -> dict:
+        data = dict((phase, getattr(self, phase)) for phase in PHASES)
+        data.update(total=self.total, bytes_sent=self.bytes_sent, bytes_received=self.bytes_received,
+                    body_received=self.body_received, body_decoded=self.body_decoded, decode=self.decode,
+                    reused=self.reused)
+        return data
+
+    def rows(self) -> list:
+        """ Rows of (phase, value) suitable for print_table """
+        rows = [(phase, "{:.3f}ms".format(getattr(self, phase) * 1000)) for phase in PHASES]
+        rows.append(("total", "{:.3f}ms".format(self.total * 1000)))
+        rows.append(("bytes sent", self.bytes_sent))
+        rows.append(("bytes received", self.bytes_received))
+        if self.body_decoded != self.body_received:
+            rows.append(("body on the wire", self.body_received))
+            rows.append(("body decoded", "{} ({:.1f}x)".format(
+                self.body_decoded, self.body_decoded / self.body_received if self.body_received else 0.0)))
+            rows.append(("decompression", "{:.3f}ms".format(self.decode * 1000)))
+        rows.append(("connection", "reused" if self.reused else "new"))
+        return rows
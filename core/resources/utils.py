@@ -7,7 +7,10 @@ import core.resources as resources
 import templates
 
 from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.index_cache import INDEX_CACHE, file_version
 from core.resources.printer import print_error
+from core.resources.search import option_tokens, template_tokens, template_file
+from core.resources.template_store import get_template_store
 
 MODULES_DIR = cfw_modules.__path__[0]
 RESOURCES_DIR = resources.__path__[0]
@@ -35,6 +38,44 @@ def index_templates(templates_directory: str = TEMPLATES_DIR) -> list:
 
     return saved_templ
 
+
+def cached_index_modules() -> list:
+    return INDEX_CACHE.get("modules", MODULES_DIR, index_modules)
+
+
+def template_store():
+    """ Store of saved templates, the SQLite database once 'templates import' created it """
+    return get_template_store(TEMPLATES_DIR)
+
+
+def cached_index_templates() -> list:
+    store = template_store()
+    if store.indexed:
+        return store.names()
+    return INDEX_CACHE.get("templates", TEMPLATES_DIR, index_templates)
+
+
+def cached_template_tokens(saved_templates: list) -> dict:
+    """ Search tokens of every saved template, reading only templates that are new or changed since cached """
+    store = template_store()
+    if store.indexed:
+        return {template: sorted(option_tokens({key: value[0] for key, value in attributes.items()}))
+                for template, attributes in store.items()}
+    return INDEX_CACHE.get_mapping("template_tokens", saved_templates,
+                                   lambda template: template_tokens(template_file(TEMPLATES_DIR, template)),
+                                   lambda template: file_version(template_file(TEMPLATES_DIR, template)))
+
+
+def record_saved_template(template: str, tokens: list) -> None:
+    """ Add a template written by 'save' to the cached index, template being a dotted name like post.name """
+    if template_store().indexed:
+        return
+    path = template_file(TEMPLATES_DIR, template)
+    if os.path.isfile(path):
+        INDEX_CACHE.add("templates", template, os.path.dirname(path))
+        INDEX_CACHE.set_mapping("template_tokens", template, tokens, file_version(path))
+
+
 def filter_modules(x):
     if not x.startswith("__") and x.endswith(".py"):
         return True
@@ -67,12 +108,16 @@ def humanize_path(path: str) -> str:
     return path.replace(".", "/")
 
 
+def humanize_template(name: str) -> str:
+    """ 'post.v1.2' -> 'post/v1.2', template names may contain dots after their package """
+    return "/".join(name.split(".", 1))
+
+
 def module_required(fn):
     @wraps(fn)
     def wrapper(self, *args, **kwargs):
         if not self.current_module:
-            print_error("You have to activater any module with 'use' command.")
-            return
+            raise CurlFrameworkException("You have to activate a module with the 'use' command.")
         return fn(self, *args, **kwargs)
 
     try:
@@ -1,20 +1,22 @@
 import atexit
+import collections
 import itertools
 import os
-import pkgutil
-import readline
 import sys
-import traceback
 from builtins import getattr, AttributeError, dict, super, dir, len, IndexError
 from collections import Counter
 import getopt
 
 from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.search import PrefixTrie, SearchIndex, option_tokens, tokenize
 from core.resources.utils import (
-    index_modules,
-    index_templates,
+    cached_index_modules,
+    cached_index_templates,
+    cached_template_tokens,
+    record_saved_template,
     pythonize_path,
     humanize_path,
+    humanize_template,
     import_template,
     module_required,
     MODULES_DIR,
@@ -27,12 +29,26 @@ from core.resources.printer import (
     print_table,
     pprint_dict_in_order,
     PrinterThread,
-    printer_queue
+    printer_queue,
+    set_synchronous
 )
+from core.engines import active_engines
+from interpreter import USAGE
+
+
+# One parsed script command, and a repeat block of them
+ScriptCommand = collections.namedtuple("ScriptCommand", ["line", "handler", "args", "kwargs"])
+ScriptLoop = collections.namedtuple("ScriptLoop", ["line", "count", "body"])
+
+
+def _readline():
+    """ readline and the history file are only needed by the interactive console, so load them on first use """
+    import readline
+    return readline
 
 
 def is_libedit():
-    return "libedit" in readline.__doc__
+    return "libedit" in _readline().__doc__
 
 
 class BaseInterpreter:
@@ -41,10 +57,10 @@ class BaseInterpreter:
     global_help = ""
 
     def __init__(self):
-        self.setup()
         self.banner = ""
 
     def setup(self):
+        readline = _readline()
         if not os.path.exists(self.history_file):
             with open(self.history_file, "a+") as history:
                 if is_libedit():
@@ -82,6 +98,7 @@ class BaseInterpreter:
         return command_handler
 
     def start(self):
+        self.setup()
         print_info(self.banner)
         printer_queue.join()
         while True:
@@ -100,8 +117,88 @@ class BaseInterpreter:
             finally:
                 printer_queue.join()
 
+    def parse_script(self, lines, name="<script>") -> list:
+        """ Parse script lines into ScriptCommands and ScriptLoops, resolving every handler up front
+
+        Blank lines and lines starting with # are skipped. 'repeat N <command>' runs one
+        command N times, 'repeat N' on its own line repeats everything up to the matching
+        'end'. Errors name the offending line before anything runs.
+        """
+        root = []
+        blocks = [(None, root)]
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            command, args, kwargs = self.parse_line(line)
+            if command == "end":
+                if len(blocks) == 1:
+                    raise CurlFrameworkException("{}:{}: end without repeat".format(name, number))
+                blocks.pop()
+                continue
+            if command == "repeat":
+                count, _, rest = line.split(None, 1)[1].partition(" ") if args else ("", "", "")
+                try:
+                    count = int(count)
+                except ValueError:
+                    raise CurlFrameworkException("{}:{}: Usage: repeat <count> [command]".format(name, number))
+                loop = ScriptLoop(number, count, [])
+                blocks[-1][1].append(loop)
+                if rest.strip():
+                    command, args, kwargs = self.parse_line(rest)
+                    loop.body.append(ScriptCommand(number, self._script_handler(command, name, number), args, kwargs))
+                else:
+                    blocks.append((number, loop.body))
+                continue
+            blocks[-1][1].append(ScriptCommand(number, self._script_handler(command, name, number), args, kwargs))
+        if len(blocks) > 1:
+            raise CurlFrameworkException("{}:{}: repeat without end".format(name, blocks[-1][0]))
+        return root
+
+    def _script_handler(self, command, name, number):
+        try:
+            return self.get_command_handler(command)
+        except CurlFrameworkException as err:
+            raise CurlFrameworkException("{}:{}: {}".format(name, number, err))
+
+    def run_script(self, lines, name="<script>") -> bool:
+        """ Run interpreter commands without readline, history or banner, False when the script failed
+
+        Everything runs in this process, so modules, engines and their pooled connections
+        are shared by all commands. The script stops at the first command raising an error,
+        reported with its line number.
+        """
+        try:
+            steps = self.parse_script(lines, name)
+        except CurlFrameworkException as err:
+            print_error(err)
+            return False
+        try:
+            return self._run_steps(steps, name)
+        except EOFError:
+            return True
+        finally:
+            printer_queue.join()
+
+    def _run_steps(self, steps, name) -> bool:
+        for step in steps:
+            if isinstance(step, ScriptLoop):
+                for _ in range(step.count):
+                    if not self._run_steps(step.body, name):
+                        return False
+                continue
+            try:
+                step.handler(step.args, **step.kwargs)
+            except EOFError:
+                raise
+            except Exception as err:
+                print_error("{}:{}: {}".format(name, step.line, err))
+                return False
+        return True
+
     def complete(self, text, state):
         if state == 0:
+            readline = _readline()
             original_line = readline.get_line_buffer()
             line = original_line.lstrip()
             stripped = len(original_line) - len(line)
@@ -147,16 +244,31 @@ class CurlyInterpreter(BaseInterpreter):
     use <template>                   Use template
     exec <shell cmd> <args>          Execute a command in a shell
     search <search term>             Search for template
+    batch <manifest> [workers=N]     Run the saved templates listed in a manifest in parallel
+    templates import|export [dir]    Move saved templates between JSON files and the templates.db store
+    templates find [host=H] [path=P] List saved templates by host and path (templates.db store)
     exit                             Exit CurlFramework"""
 
     module_help = """Template commands:
     execute                             Execute the selected template with given options
+    run bench <method> [requests=N] [duration=S] [concurrency=N] [processes=N|auto]
+                                        Load test the template, reporting throughput and latency percentiles
+    run soak <method> rate=N [duration=S] [profile=constant|ramp|step|poisson] [processes=N|auto]
+                                        Send at a fixed arrival rate, timing latency from the intended send time
+    run report [results file]           Summarise a result store written by a run with 'set results <file>'
+    run replay <log> [timing=original|fast] [workers=N]
+                                        Re-send a session recorded with 'set record <log>'
     back                                De-select current template
     set <option name> <option value>    Set an option for the selected template
     setg <option name> <option value>   Set an option for all the templates
+    add <option> [<name> <value>]       Add an entry to headers, query_params or path_params, asking when not given
+    delete <option> <name>              Remove an entry from headers, query_params or path_params
     unsetg <option name>                Unset an option that was set globally
     show [info|options]                 Print information or options for a module
     show templates [module]             Print saved tempaltes for a module
+    show pool                           Print open, idle and reused pooled connections per engine
+    show cache                          Print response cache hits, misses and revalidations
+    show timings                        Print DNS, connect, TLS, TTFB, transfer and decompression of the last request
     check                               Check if given host is reachable"""
 
     def __init__(self):
@@ -167,21 +279,26 @@ class CurlyInterpreter(BaseInterpreter):
         self.raw_prompt_template = None
         self.module_prompt_template = None
         self.prompt_hostname = "cfw"
-        self.show_sub_commands = ("info", "options", "advanced", "all", "templates", "modules")
+        self.show_sub_commands = ("info", "options", "advanced", "all", "templates", "modules", "pool", "cache", "timings")
         self.search_sub_commands = ("type", "payload")
+        self.templates_sub_commands = ("import", "export", "find")
 
-        self.global_commands = sorted(["use ", "exec ", "help", "exit", "show ", "search "])
+        self.global_commands = sorted(["use ", "exec ", "help", "exit", "show ", "search ", "batch ", "templates "])
         self.module_commands = ["execute", "back", "set ", "setg ", "check"]
         self.module_commands.extend(self.global_commands)
         self.module_commands.sort()
 
-        self.modules = index_modules()
+        self.modules = cached_index_modules()
         self.modules_count = Counter()
         self.modules_count.update([module.split('.')[0] for module in self.modules])
-        self.saved_templates = index_templates()
+        self.saved_templates = cached_index_templates()
         self.saved_templates_count = Counter()
         self.saved_templates_count.update([template.split('.')[0] for template in self.saved_templates])
         self.main_modules_dirs = [module for module in os.listdir(MODULES_DIR) if not module.startswith("__")]
+        self._modules_trie = None
+        self._templates_trie = None
+        self._search_index = None
+        self._module_instances = {}
 
         self.__parse_prompt()
         self.banner = """
@@ -216,41 +333,78 @@ _________              .__
         self.nonInteractive(argv)
 
     def nonInteractive(self, argv):
+        """ Run the command line options once, returning the process exit status """
+        set_synchronous(True)
         module = ""
         set_opts = []
+        manifest = ""
+        workers = "4"
+        script = ""
+        run = ""
+        usage = USAGE.format(argv[0])
 
         try:
-            opts, args = getopt.getopt(argv[1:], "hm:s", ["help=", "module=", "set="])
+            opts, args = getopt.getopt(argv[1:], "hm:s:b:w:f:r:", ["help=", "module=", "set=", "batch=", "workers=",
+                                                                   "file=", "run="])
         except getopt.GetoptError:
-            print_info("{} -m <module> -s \"<option> <value>\"".format(argv[0]))
+            print_info(usage)
             printer_queue.join()
-            return
+            return 2
 
         for opt, arg in opts:
             if opt in ("-h", "--help"):
-                print_info("{} -m <module> -s \"<option> <value>\"".format(argv[0]))
+                print_info(usage)
                 printer_queue.join()
-                return
+                return 0
             elif opt in ("-m", "--module"):
                 module = arg
             elif opt in ("-s", "--set"):
                 set_opts.append(arg)
-
-        if not len(module):
+            elif opt in ("-b", "--batch"):
+                manifest = arg
+            elif opt in ("-w", "--workers"):
+                workers = arg
+            elif opt in ("-f", "--file"):
+                script = arg
+            elif opt in ("-r", "--run"):
+                run = arg
+
+        if script:
+            return 0 if self.run_script_file(script) else 1
+
+        if not manifest and not len(module):
             print_error('A module is required when running non-interactively')
             printer_queue.join()
-            return
-
-        self.command_use(module)
+            return 2
 
-        for opt in set_opts:
-            self.command_set(opt)
-
-        self.command_run()
+        try:
+            self.command_use(module or "request")
+            for opt in set_opts:
+                self.command_set(opt)
+            if manifest:
+                self.command_batch(manifest, workers=workers)
+            else:
+                command, args, kwargs = self.parse_line("run " + run)
+                self.command_run(args, **kwargs)
+        except CurlFrameworkException as err:
+            print_error(err)
+            return 1
+        finally:
+            printer_queue.join()
 
-        printer_queue.join()
+        return 0
 
-        return
+    def run_script_file(self, path) -> bool:
+        if path == "-":
+            return self.run_script(sys.stdin.read().splitlines(), "<stdin>")
+        try:
+            with open(path) as script:
+                lines = script.read().splitlines()
+        except OSError as err:
+            print_error("Cannot read script '{}': {}".format(path, err.strerror))
+            printer_queue.join()
+            return False
+        return self.run_script(lines, path)
 
     @property
     def module_metadata(self):
@@ -267,16 +421,34 @@ _________              .__
         else:
             return self.raw_prompt_template.format(host=self.prompt_hostname)
 
+    @property
+    def modules_trie(self):
+        if self._modules_trie is None:
+            self._modules_trie = PrefixTrie(self.modules)
+        return self._modules_trie
+
+    @property
+    def templates_trie(self):
+        if self._templates_trie is None:
+            self._templates_trie = PrefixTrie(self.saved_templates)
+        return self._templates_trie
+
+    @property
+    def search_index(self):
+        """ Inverted index over modules and saved templates, built on the first search """
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+            for module in self.modules:
+                self._search_index.add(("module", module), tokenize(module))
+            templates_tokens = cached_template_tokens(self.saved_templates)
+            for template in self.saved_templates:
+                self._search_index.add(("template", template),
+                                       tokenize(template).union(templates_tokens.get(template, ())))
+        return self._search_index
+
     def available_modules_completion(self, text):
         text = pythonize_path(text)
-        all_possible_matches = filter(lambda x: x.startswith(text), self.modules)
-        matches = set()
-        for match in all_possible_matches:
-            head, sep, tail = match[len(text):].partition('.')
-            if not tail:
-                sep = ""
-            matches.add("".join((text, head, sep)))
-        return list(map(humanize_path, matches))
+        return list(map(humanize_path, self.modules_trie.segments(text)))
 
     def suggested_commands(self):
         if self.current_module and GLOBAL_OPTS:
@@ -292,10 +464,10 @@ _________              .__
     def command_use(self, module_path, *args, **kwargs):
         module_path = pythonize_path(module_path)
         module_path = ".".join(("core", "modules", module_path))
-        try:
-            self.current_module = import_template(module_path)()
-        except CurlFrameworkException as err:
-            print_error(str(err))
+        module = self._module_instances.get(module_path)
+        if module is None:
+            module = self._module_instances[module_path] = import_template(module_path)()
+        self.current_module = module
 
     @stop_after(2)
     def complete_use(self, text, *args, **kwargs):
@@ -307,27 +479,53 @@ _________              .__
     @module_required
     def command_run(self, *args, **kwargs):
         print_status("Running module {}...".format(self.current_module))
-        sub_command = args[0]
+        sub_command, _, sub_args = (args[0] if args else "").partition(" ")
         try:
-            getattr(self.current_module, sub_command)()
+            handler = getattr(self.current_module, sub_command)
+        except AttributeError:
+            if sub_command == '':
+                raise CurlFrameworkException("Usage: run <request method: {}>".format(
+                    "get, post, put, delete, bench <method>, soak <method>, replay <log>"))
+            raise CurlFrameworkException("Unknown command [{}]".format(sub_command))
+        try:
+            if sub_args or kwargs:
+                handler(*sub_args.split(), **kwargs)
+            else:
+                handler()
         except KeyboardInterrupt:
             print_info()
             print_error("Operation cancelled by user")
-        except AttributeError:
-            if sub_command is '':
-                print_error("Usage: run <request method: {}>".format("get, post, put, delete"))
-            else:
-                print_error("Unknown command [{}]".format(sub_command))
+        except CurlFrameworkException:
+            raise
         except Exception as ex:
-            print_error(str(ex))
+            raise CurlFrameworkException(str(ex))
+
+    def command_batch(self, *args, **kwargs):
+        if not self.current_module:
+            self.command_use("request")
+        try:
+            batch = self.current_module.batch
+        except AttributeError:
+            raise CurlFrameworkException("Module {} does not support batch runs".format(self.current_module))
+        batch(args[0], **kwargs)
 
     @module_required
     def command_save(self, *args, **kwargs):
         # try:
         if args[0] is not None and args[0] is not '':
-            self.current_module.save(args=args)
+            if self.current_module.save(args=args):
+                template = "post." + args[0]
+                tokens = option_tokens({key: value[0] for key, value in self.current_module.saved_attributes.items()})
+                if template not in self.saved_templates:
+                    self.saved_templates.append(template)
+                    self.saved_templates_count[template.split('.')[0]] += 1
+                    if self._templates_trie is not None:
+                        self._templates_trie.add(template)
+                    if self._search_index is not None:
+                        self._search_index.add(("template", template), tokenize(template).union(tokens))
+                record_saved_template(template, sorted(tokens))
         else:
-            print_error("Template name must be specified")
+            raise CurlFrameworkException("Template name must be specified")
         # except Exception:
         # print_error("Error saving template")
 
@@ -336,24 +534,26 @@ _________              .__
         if args[0] is not None and args[0] is not '':
             self.current_module.load(args=args)
         else:
-            print_error("Template name must be specified")
+            raise CurlFrameworkException("Template name must be specified")
+
+    @stop_after(2)
+    def complete_load(self, text, *args, **kwargs):
+        return [template[len("post."):] for template in self.templates_trie.words("post." + text)]
 
     @module_required
     def command_set(self, *args, **kwargs):
         key, _, value = args[0].partition(" ")
         if key in self.current_module.options:
             if isinstance(self.current_module.module_attributes[key][0], dict):
-                print_error("Cannot set value for field {}, use add command instead".format(key))
-                return
+                raise CurlFrameworkException("Cannot set value for field {}, use add command instead".format(key))
             setattr(self.current_module, key, value)
-            self.current_module.module_attributes[key][0] = value
 
             if kwargs.get("glob", False):
                 GLOBAL_OPTS[key] = value
             print_success("{} => {}".format(key, value))
         else:
-            print_error("You can't set option: '{}'.\n"
-                        "Available options: {}".format(key, self.current_module.options))
+            raise CurlFrameworkException("You can't set option: '{}'.\n"
+                                         "Available options: {}".format(key, self.current_module.options))
 
     @stop_after(2)
     def complete_set(self, text, *args, **kwargs):
@@ -362,32 +562,42 @@ _________              .__
 
     @module_required
     def command_add(self, *args, **kwargs):
-        key = args[0]
-        if key in self.current_module.options:
-            templist = getattr(self.current_module, key)
+        """ add <option> [<name> <value>], asking for name and value when they are not given """
+        key, _, entry = args[0].partition(" ")
+        templist = self._dict_option(key)
+        name, _, value = entry.strip().partition(" ")
+        if not name:
             print_info("Header name:")
-            value = input()
+            name = input()
             print_info("Header value:")
-            templist[value] = input()
-            setattr(self.current_module, key, templist)
-            self.current_module.module_attributes[key][0][value] = templist[value]
-
-            print_success("{} => {}: {}".format(key, value, templist[value]))
+            value = input()
+        templist[name] = value.strip()
+        setattr(self.current_module, key, templist)
+
+        print_success("{} => {}: {}".format(key, name, templist[name]))
+
+    def _dict_option(self, key):
+        """ The dictionary option key of the current module, like headers or query_params """
+        if key not in self.current_module.options:
+            raise CurlFrameworkException("You can't edit option: '{}'.\n"
+                                         "Available options: {}".format(key, self.current_module.options))
+        templist = getattr(self.current_module, key)
+        if not isinstance(templist, dict):
+            raise CurlFrameworkException("Cannot add to or delete from option {}, only dictionary options have "
+                                         "entries, overwrite it with set instead".format(key))
+        return templist
 
     @module_required
     def command_delete(self, *args, **kwargs):
         key, _, value = args[0].partition(" ")
-        if key in self.current_module.options:
-            templist = getattr(self.current_module, key)
-            if not isinstance(templist, dict):
-                print_error("Cannot delete attribute {}, only dictionary entries can be deleted, overwrite it instead"
-                            .format(key))
-                return
+        templist = self._dict_option(key)
+        try:
             del templist[value]
-            setattr(self.current_module, key, templist)
-            del self.current_module.module_attributes[key][0][value]
+        except KeyError:
+            raise CurlFrameworkException("{} has no entry '{}'".format(key, value))
+        setattr(self.current_module, key, templist)
 
-            print_error("{} => {}".format(key, value))
+        print_error("{} => {}".format(key, value))
 
     @module_required
     def command_setg(self, *args, **kwargs):
@@ -404,8 +614,8 @@ _________              .__
         try:
             del GLOBAL_OPTS[key]
         except KeyError:
-            print_error("Cannot unset global option '{}'.\n"
-                        "Available global options: {}".format(key, list(GLOBAL_OPTS.keys())))
+            raise CurlFrameworkException("Cannot unset global option '{}'.\n"
+                                         "Available global options: {}".format(key, list(GLOBAL_OPTS.keys())))
         else:
             print_success({key: value})
 
@@ -418,11 +628,12 @@ _________              .__
 
     @module_required
     def get_opts(self, *args):
+        module_attributes = self.current_module.module_attributes
         for opt_key in args:
             try:
-                # opt_description = self.current_module.module_attributes[opt_key][1]
-                opt_display_value = self.current_module.module_attributes[opt_key][0]
-                if self.current_module.module_attributes[opt_key][1]:
+                # opt_description = module_attributes[opt_key][1]
+                opt_display_value = module_attributes[opt_key][0]
+                if module_attributes[opt_key][1]:
                     continue
             except (KeyError, IndexError, AttributeError):
                 pass
@@ -491,15 +702,70 @@ _________              .__
     def _show_templates(self, *args, **kwargs):
         modulename = type(self.current_module).__name__
         for template in [template for template in self.saved_templates if template.startswith(modulename)]:
-            print_info(template.replace('.', os.sep))
+            print_info(humanize_template(template))
+
+    def command_templates(self, *args, **kwargs):
+        from core.resources.template_store import SqliteTemplateStore, template_db_path
+        from core.resources.utils import TEMPLATES_DIR, template_store
+
+        sub_command, _, directory = (args[0] if args else "").partition(" ")
+        directory = directory.strip() or TEMPLATES_DIR
+        if sub_command == "import":
+            store = SqliteTemplateStore(template_db_path(TEMPLATES_DIR))
+            try:
+                count = store.import_json(directory)
+            finally:
+                store.close()
+            print_success("Imported {} templates into {}".format(count, store.path))
+            self._reload_templates()
+        elif sub_command in ("export", "find"):
+            store = template_store()
+            if not store.indexed:
+                raise CurlFrameworkException("No template store yet, create {} with 'templates import'".format(
+                    template_db_path(TEMPLATES_DIR)))
+            if sub_command == "export":
+                print_success("Exported {} templates to {}".format(store.export_json(directory), directory))
+            else:
+                for template in store.find(kwargs.get("host"), kwargs.get("path")):
+                    print_info(humanize_template(template))
+        else:
+            raise CurlFrameworkException("Unknown 'templates' subcommand '{}'. "
+                                         "Possible choices: {}".format(sub_command, self.templates_sub_commands))
+
+    @stop_after(2)
+    def complete_templates(self, text, *args, **kwargs):
+        return [command for command in self.templates_sub_commands if command.startswith(text)]
+
+    def _reload_templates(self):
+        self.saved_templates = cached_index_templates()
+        self.saved_templates_count = Counter(template.split('.')[0] for template in self.saved_templates)
+        self._templates_trie = None
+        self._search_index = None
+
+    def _show_pool(self, *args, **kwargs):
+        headers = ("Engine", "Host", "Open", "Idle", "Requests", "Reused", "Last used")
+        print_table(headers, *[(engine.name,) + row for engine in active_engines() for row in engine.stats()])
+
+    @module_required
+    def _show_timings(self, *args, **kwargs):
+        try:
+            show_timings = self.current_module.show_timings
+        except AttributeError:
+            raise CurlFrameworkException("Module {} does not record timings".format(self.current_module))
+        show_timings()
+
+    def _show_cache(self, *args, **kwargs):
+        from core.resources.cache import RESPONSE_CACHE
+
+        print_table(("Metric", "Value"), *RESPONSE_CACHE.stats())
 
     def command_show(self, *args, **kwargs):
         sub_command = args[0]
         try:
             getattr(self, "_show_{}".format(sub_command))(*args, **kwargs)
         except AttributeError:
-            print_error("Unknown 'show' subcommand '{}'. "
-                        "Possible choices: {}".format(sub_command, self.show_sub_commands))
+            raise CurlFrameworkException("Unknown 'show' subcommand '{}'. "
+                                         "Possible choices: {}".format(sub_command, self.show_sub_commands))
 
     @stop_after(2)
     def complete_show(self, text, *args, **kwargs):
@@ -513,14 +779,18 @@ _________              .__
         if self.current_module:
             print_info("\n", self.module_help)
 
+    def _indexed_children(self, prefix):
+        """ Names directly below prefix in the module index, like pkgutil.iter_modules without touching disk """
+        return set(module[len(prefix):].split('.')[0] for module in self.modules if module.startswith(prefix))
+
     def command_search(self, *args, **kwargs):
         mod_type = ''
         mod_detail = ''
         mod_vendor = ''
-        existing_modules = [name for _, name, _ in pkgutil.iter_modules([MODULES_DIR])]
+        existing_modules = self._indexed_children("modules.")
         # TODO: Probably gonna need refactoring
-        devices = [name for _, name, _ in pkgutil.iter_modules([os.path.join(MODULES_DIR, 'modules')])]
-        payloads = [name for _, name, _ in pkgutil.iter_modules([os.path.join(MODULES_DIR, 'payloads')])]
+        devices = self._indexed_children("modules.modules.")
+        payloads = self._indexed_children("modules.payloads.")
 
         try:
             keyword = args[0].strip("'\"").lower()
@@ -528,43 +798,51 @@ _________              .__
             keyword = ''
 
         if not (len(keyword) or len(kwargs.keys())):
-            print_error("Please specify at least one search keyword")
-            print_error("You can specify options, eg 'search type=modules etc'")
+            raise CurlFrameworkException("Please specify at least one search keyword\n"
+                                         "You can specify options, eg 'search type=modules etc'")
 
         for (key, value) in kwargs.items():
             if key == 'type':
                 if value not in existing_modules:
-                    print_error("Unknown module type")
-                    return
+                    raise CurlFrameworkException("Unknown module type")
                 mod_type = "{}.".format(value)
             elif key in ['device', 'language', 'payload']:
                 if key == 'device' and (value not in devices):
-                    print_error("Unknown module type")
-                    return
+                    raise CurlFrameworkException("Unknown module type")
                 elif key == 'payload' and (value not in payloads):
-                    print_error("Unknown payload type")
-                    return
+                    raise CurlFrameworkException("Unknown payload type")
                 mod_detail = ".{}.".format(value)
             elif key == 'vendor':
                 mod_vendor = ".{}.".format(value)
 
-        for module in self.modules:
+        if len(keyword):
+            hits = self.search_index.search(keyword)
+            modules = sorted(name for kind, name in hits if kind == "module")
+            templates = sorted(name for kind, name in hits if kind == "template")
+        else:
+            modules = self.modules
+            templates = []
+
+        for module in modules:
             if mod_type not in str(module):
                 continue
             if mod_detail not in str(module):
                 continue
             if mod_vendor not in str(module):
                 continue
-            if not all(word in str(module) for word in keyword.split()):
-                continue
 
-            found = humanize_path(module)
+            print_info(self._highlight(humanize_path(module), keyword))
 
-            if len(keyword):
-                for word in keyword.split():
-                    found = found.replace(word, "\033[31m{}\033[0m".format(word))
+        if templates and not (mod_type or mod_detail or mod_vendor):
+            print_info("\nTemplates:")
+            for template in templates:
+                print_info(self._highlight(humanize_template(template), keyword))
 
-            print_info(found)
+    @staticmethod
+    def _highlight(found, keyword):
+        for word in keyword.split():
+            found = found.replace(word, "\033[31m{}\033[0m".format(word))
+        return found
 
     def complete_search(self, text, *args, **kwargs):
         if text:
@@ -0,0 +1,3 @@
+# Kept here rather than in CurlyInterpreter so Kernel.py can answer -h without loading the interpreter
+USAGE = ("{0} -m <module> -s \"<option> <value>\" [-r \"<run arguments>\"] [-b <manifest> -w <workers>]\n"
+         "{0} -f <script file, - for stdin>")
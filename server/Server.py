@@ -1,23 +1,303 @@
 #!/usr/bin/env python
 
-# Simple HTTP Server that accepts only GET requests and prints request parameters
+# Local HTTP test target for Curly's engines, benchmarks and load tests
 # Use this to test curly if you are contributing :)
+#
+#   python server/Server.py --port 8000 --size 1024 --latency 5 --status 200:95,503:5
+#
+# Every method is accepted on every path. Query parameters override the defaults
+# for a single request:
+#
+#   size=<bytes>                     response body size
+#   latency=<ms>                     injected latency before responding
+#   dist=fixed|uniform|exponential|normal
+#                                    latency distribution, latency being its mean
+#   jitter=<ms>                      spread for uniform (+/-) and normal (stddev)
+#   status=<code>[:weight],...       status code mix, e.g. 200:90,500:10
+#   chunked=1                        send the body with Transfer-Encoding: chunked
+#   chunk=<bytes>                    chunk size for chunked bodies
+#   echo=1                           respond with the request body
+#
+# Bodies are gzip or deflate compressed when the request's Accept-Encoding asks for
+# it, and gzip or deflate request bodies (Content-Encoding) are decoded before echoing.
+#
+# GET /__stats returns request counters as JSON, DELETE /__stats resets them.
 
+import argparse
+import collections
+import gzip
 import http.server
-import socketserver
+import json
 import logging
+import random
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qs
 
 PORT = 8000
+STATS_PATH = "/__stats"
 
 
-class GetHandler(http.server.SimpleHTTPRequestHandler):
+class ServerConfig(object):
 
-    def do_GET(self):
-        logging.error(self.headers)
-        http.server.SimpleHTTPRequestHandler.do_GET(self)
+    def __init__(self, size=64, latency=0.0, dist="fixed", jitter=0.0, status="200", chunked=False, chunk=8192):
+        self.size = size
+        self.latency = latency
+        self.dist = dist
+        self.jitter = jitter
+        self.status = status
+        self.chunked = chunked
+        self.chunk = chunk
 
 
-Handler = GetHandler
-httpd = socketserver.TCPServer(("", PORT), Handler)
+class ServerStats(object):
 
-httpd.serve_forever()
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.methods = collections.Counter()
+            self.statuses = collections.Counter()
+            self.bytes_received = 0
+            self.bytes_sent = 0
+            self.connections = 0
+            self.active = 0
+
+    def record(self, method, status, received, sent):
+        with self._lock:
+            self.methods[method] += 1
+            self.statuses[str(status)] += 1
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+    def connection(self, delta):
+        with self._lock:
+            self.active += delta
+            if delta > 0:
+                self.connections += 1
+
+    def to_json(self):
+        with self._lock:
+            uptime = time.time() - self.started
+            requests = sum(self.methods.values())
+            return {
+                "uptime": uptime,
+                "requests": requests,
+                "requests_per_second": requests / uptime if uptime else 0.0,
+                "methods": dict(self.methods),
+                "statuses": dict(self.statuses),
+                "bytes_received": self.bytes_received,
+                "bytes_sent": self.bytes_sent,
+                "connections": self.connections,
+                "active_connections": self.active,
+            }
+
+
+def parse_status_mix(value):
+    """ '200:90,500:10' -> ([200, 500], [90.0, 10.0]) """
+    codes, weights = [], []
+    for part in value.split(","):
+        code, _, weight = part.strip().partition(":")
+        codes.append(int(code))
+        weights.append(float(weight) if weight else 1.0)
+    return codes, weights
+
+
+def negotiate_encoding(accept_encoding):
+    """ First of gzip and deflate named in an Accept-Encoding header, "" when neither is """
+    codings = [part.split(";", 1)[0].strip().lower() for part in accept_encoding.split(",")]
+    for coding in ("gzip", "deflate"):
+        if coding in codings:
+            return coding
+    return ""
+
+
+def compress(payload, coding):
+    return zlib.compress(payload) if coding == "deflate" else gzip.compress(payload, mtime=0)
+
+
+def sample_latency(latency, dist, jitter):
+    """ Latency in seconds drawn from the named distribution, latency and jitter given in ms """
+    if dist == "uniform":
+        value = random.uniform(latency - jitter, latency + jitter)
+    elif dist == "exponential":
+        value = random.expovariate(1.0 / latency) if latency > 0 else 0.0
+    elif dist == "normal":
+        value = random.gauss(latency, jitter)
+    else:
+        value = latency
+    return max(value, 0.0) / 1000.0
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_version = "CurlyTestServer/0.1"
+
+    def setup(self):
+        super(Handler, self).setup()
+        self.server.stats.connection(1)
+
+    def finish(self):
+        super(Handler, self).finish()
+        self.server.stats.connection(-1)
+
+    def log_message(self, format, *args):
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+    def _read_body(self):
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0].strip(), 16)
+                if not size:
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _decode_body(self, body):
+        coding = self.headers.get("Content-Encoding", "").strip().lower()
+        if coding == "gzip":
+            return gzip.decompress(body)
+        if coding == "deflate":
+            return zlib.decompress(body)
+        return body
+
+    def _option(self, query, name, default, cast):
+        try:
+            return cast(query[name][0])
+        except (KeyError, IndexError, ValueError):
+            return default
+
+    def _handle(self):
+        logging.debug(self.headers)
+        body = self._read_body()
+        url = urlsplit(self.path)
+
+        if url.path == STATS_PATH:
+            if self.command == "DELETE":
+                self.server.stats.reset()
+            self._respond(200, json.dumps(self.server.stats.to_json()).encode("utf-8"), len(body), record=False,
+                          content_type="application/json")
+            return
+
+        config = self.server.config
+        query = parse_qs(url.query)
+        delay = sample_latency(self._option(query, "latency", config.latency, float),
+                               self._option(query, "dist", config.dist, str),
+                               self._option(query, "jitter", config.jitter, float))
+        if delay:
+            time.sleep(delay)
+
+        codes, weights = parse_status_mix(self._option(query, "status", config.status, str))
+        status = random.choices(codes, weights)[0] if len(codes) > 1 else codes[0]
+
+        if self._option(query, "echo", 0, int):
+            payload = self._decode_body(body)
+        else:
+            payload = b"x" * self._option(query, "size", config.size, int)
+        chunked = bool(self._option(query, "chunked", int(config.chunked), int))
+        chunk = self._option(query, "chunk", config.chunk, int)
+        if chunk <= 0:
+            self._respond(400, b"chunk must be a positive number of bytes", len(body), content_type="text/plain")
+            return
+        self._respond(status, payload, len(body), chunked=chunked, chunk=chunk,
+                      coding=negotiate_encoding(self.headers.get("Accept-Encoding", "")))
+
+    def _respond(self, status, payload, received, chunked=False, chunk=8192, record=True,
+                 content_type="application/octet-stream", coding=""):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if status in (204, 304):
+            # No body and so no framing or coding headers either
+            payload = b""
+            self.end_headers()
+        else:
+            if coding and payload:
+                payload = compress(payload, coding)
+                self.send_header("Content-Encoding", coding)
+            if chunked:
+                self.send_header("Transfer-Encoding", "chunked")
+            else:
+                self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            # HEAD gets the headers a GET would, without the body
+            if self.command == "HEAD":
+                payload = b""
+            elif chunked:
+                for start in range(0, len(payload), chunk):
+                    piece = payload[start:start + chunk]
+                    self.wfile.write(b"%x\r\n" % len(piece) + piece + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.wfile.write(payload)
+        if record:
+            self.server.stats.record(self.command, status, received, len(payload))
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = do_OPTIONS = _handle
+
+
+class TestServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config=None):
+        self.config = config or ServerConfig()
+        self.stats = ServerStats()
+        super(TestServer, self).__init__(address, Handler)
+
+    @property
+    def host(self):
+        return "{}:{}".format(*self.server_address[:2])
+
+
+def make_server(host="127.0.0.1", port=0, config=None):
+    return TestServer((host, port), config)
+
+
+def serve_in_thread(host="127.0.0.1", port=0, config=None):
+    """ Start a server on a daemon thread, port 0 picks a free port (see server.host) """
+    server = make_server(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve(port=PORT, host="", config=None):
+    make_server(host, port, config).serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Curly local test server")
+    parser.add_argument("--host", default="")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--size", type=int, default=64, help="Response body size in bytes")
+    parser.add_argument("--latency", type=float, default=0.0, help="Injected latency in ms")
+    parser.add_argument("--dist", default="fixed", choices=("fixed", "uniform", "exponential", "normal"))
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency spread in ms")
+    parser.add_argument("--status", default="200", help="Status mix, e.g. 200:95,503:5")
+    parser.add_argument("--chunked", action="store_true", help="Send bodies chunked")
+    parser.add_argument("--chunk", type=int, default=8192, help="Chunk size in bytes")
+    parser.add_argument("--verbose", action="store_true", help="Log every request and its headers")
+    args = parser.parse_args(argv)
+    if args.chunk <= 0:
+        parser.error("--chunk must be a positive number of bytes")
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    config = ServerConfig(args.size, args.latency, args.dist, args.jitter, args.status, args.chunked, args.chunk)
+    try:
+        serve(args.port, args.host, config)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,6 @@ setup(
             "pysnmp",
             "pycryptodome",
             ],
-        extras_require={},
+        extras_require={"fast": ["numpy"]},
         classifiers=[],
         ) 
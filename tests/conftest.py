@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "server"))
+
+
+@pytest.fixture(scope="session")
+def server():
+    """ The local test server on a free port, shared by the whole session """
+    from Server import serve_in_thread
+
+    test_server = serve_in_thread()
+    yield test_server
+    test_server.shutdown()
+    test_server.server_close()
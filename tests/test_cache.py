@@ -0,0 +1,54 @@
+from core.engines.response import Headers, Response
+from core.resources.cache import ResponseCache
+
+URL = "http://example.test/item"
+
+
+def stored_entry(cache):
+    headers = Headers([("ETag", '"v1"'), ("Content-Length", "11"), ("Content-Encoding", "gzip"),
+                       ("Date", "Mon, 01 Jan 2024 00:00:00 GMT"), ("Cache-Control", "max-age=0")])
+    assert cache.store("GET", URL, {}, Response(200, "OK", headers, content=b"hello world"))
+    return cache.lookup("GET", URL, {})
+
+
+def not_modified(date, etag='"v1"'):
+    return Headers([("ETag", etag), ("Content-Length", "0"), ("Date", date), ("Cache-Control", "max-age=60")])
+
+
+def test_revalidation_replaces_headers():
+    cache = ResponseCache()
+    entry = stored_entry(cache)
+
+    for date in ("Tue, 02 Jan 2024 00:00:00 GMT", "Wed, 03 Jan 2024 00:00:00 GMT"):
+        response = cache.revalidated(entry, not_modified(date))
+        assert response.headers["ETag"] == '"v1"'
+        assert response.headers["Date"] == date
+        assert response.headers["Content-Length"] == "11"
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Cache-Control"] == "max-age=60"
+        assert response.content == b"hello world"
+        assert len(entry.headers) == 5
+
+    assert entry.fresh
+    assert cache.counters["revalidations"] == 2
+
+
+def test_revalidation_adds_new_validators():
+    cache = ResponseCache()
+    entry = stored_entry(cache)
+    update = Headers([("ETag", '"v2"'), ("Last-Modified", "Tue, 02 Jan 2024 00:00:00 GMT")])
+
+    cache.revalidated(entry, update)
+
+    assert entry.validators() == {"If-None-Match": '"v2"', "If-Modified-Since": "Tue, 02 Jan 2024 00:00:00 GMT"}
+
+
+def test_revalidation_persists_to_directory(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path))
+    entry = stored_entry(cache)
+    cache.revalidated(entry, not_modified("Tue, 02 Jan 2024 00:00:00 GMT"))
+    cache.revalidated(entry, not_modified("Wed, 03 Jan 2024 00:00:00 GMT"))
+
+    reloaded = ResponseCache(directory=str(tmp_path)).lookup("GET", URL, {})
+    assert Headers(reloaded.headers)["Date"] == "Wed, 03 Jan 2024 00:00:00 GMT"
+    assert Headers(reloaded.headers)["ETag"] == '"v1"'
@@ -0,0 +1,99 @@
+import gzip
+
+import pytest
+
+from core.engines import get_engine
+from core.resources.compression import ENCODINGS
+
+ENGINE_NAMES = ("requests", "asyncio", "socket")
+
+
+@pytest.fixture(params=ENGINE_NAMES)
+def engine(request):
+    if request.param == "requests":
+        pytest.importorskip("requests")
+    engine = get_engine(request.param)
+    engine.configure(4, True, 60, 5)
+    return engine
+
+
+def get(engine, server, path, headers=None):
+    return engine.send("GET", "http", server.host, path, headers=headers)
+
+
+def test_content_length_body(engine, server):
+    r = get(engine, server, "/?size=1000")
+    assert r.status_code == 200
+    assert r.content == b"x" * 1000
+
+
+@pytest.mark.parametrize("size, chunk", [(100, 7), (100000, 4096), (0, 8)])
+def test_chunked_body(engine, server, size, chunk):
+    r = get(engine, server, "/?chunked=1&size={}&chunk={}".format(size, chunk))
+    assert r.status_code == 200
+    assert r.content == b"x" * size
+
+
+@pytest.mark.parametrize("coding", ENCODINGS)
+@pytest.mark.parametrize("chunked", [0, 1])
+def test_compressed_body(engine, server, coding, chunked):
+    r = get(engine, server, "/?size=5000&chunked={}&chunk=5".format(chunked), headers={"Accept-Encoding": coding})
+    assert r.headers["Content-Encoding"] == coding
+    assert r.content == b"x" * 5000
+    assert r.timings.body_decoded == 5000
+    assert r.timings.body_received < r.timings.body_decoded
+
+
+def test_no_body_responses_keep_the_connection_usable(engine, server):
+    head = engine.send("HEAD", "http", server.host, "/?size=100")
+    assert head.status_code == 200
+    assert head.headers["Content-Length"] == "100"
+    assert head.content == b""
+
+    not_modified = get(engine, server, "/?status=304", headers={"Accept-Encoding": "gzip"})
+    assert not_modified.status_code == 304
+    assert "Content-Encoding" not in not_modified.headers
+    assert not_modified.content == b""
+
+    assert get(engine, server, "/?size=10").content == b"x" * 10
+
+
+def test_request_bodies(engine, server):
+    r = engine.send("POST", "http", server.host, "/?echo=1", data=b"hello")
+    assert r.content == b"hello"
+
+    r = engine.send("POST", "http", server.host, "/?echo=1", headers={"Content-Encoding": "gzip"},
+                    data=gzip.compress(b"compressed"))
+    assert r.content == b"compressed"
+
+    if engine.name != "requests":
+        # Bodies of unknown length go out chunk-encoded
+        r = engine.send("POST", "http", server.host, "/?echo=1", data=iter([b"one ", b"two"]))
+        assert r.content == b"one two"
+
+
+def test_keep_alive_reuses_connections(engine, server):
+    for _ in range(5):
+        assert get(engine, server, "/?size=10&chunked=1&chunk=3").status_code == 200
+    row = [row for row in engine.stats() if row[0] == "http://" + server.host][0]
+    assert row[4] >= 4
+
+
+def test_bad_chunk_size_is_rejected(engine, server):
+    assert get(engine, server, "/?chunked=1&chunk=0").status_code == 400
+
+
+@pytest.mark.parametrize("path", ["/?size=10", "/?size=10&chunked=1&chunk=3", "/?size=0"])
+def test_pipelining(engine, server, path):
+    if not hasattr(engine, "pipelined"):
+        pytest.skip("{} engine cannot pipeline requests".format(engine.name))
+    send = engine.pipelined("GET", "http", server.host, lambda: (path, {}, None), depth=8)
+    try:
+        for _ in range(50):
+            r = send()
+            assert r.status_code == 200
+            assert r.content == b"x" * (10 if "size=10" in path else 0)
+    finally:
+        send.close()
+    # The drained connection went back to the pool and still works
+    assert get(engine, server, "/?size=3").content == b"xxx"
@@ -0,0 +1,58 @@
+import pytest
+
+from core.exceptions.exceptions import CurlFrameworkException
+from core.resources.plan import compile_plan
+
+
+def plan(path="/", path_params=None, query_params=None, headers=None, method="GET", payload=""):
+    return compile_plan(method, "http", "example.test", path, path_params, query_params, headers, payload)
+
+
+def test_static_plan_is_resolved_once():
+    compiled = plan("/users/{id}/posts", {"id": "42"}, {"page": "2"}, {"X-Token": " abc "})
+    assert not compiled.dynamic
+    assert compiled.target() == ("/users/42/posts?page=2", {"X-Token": "abc"})
+    assert compiled.target({"id": "7"}) == compiled.target()
+
+
+def test_unset_path_placeholders_stay():
+    assert plan("/users/{id}").target()[0] == "/users/{id}"
+
+
+def test_columns_fill_path_query_and_headers():
+    compiled = plan("/orgs/${org}/users/{id}", {"id": "user-${id}"}, {"q": "${term}", "page": "1"},
+                    {"X-Id": "${id}"})
+    assert compiled.dynamic
+    path, headers = compiled.target({"org": "acme", "id": "7", "term": "a b&c"})
+    assert path == "/orgs/acme/users/user-7?page=1&q=a+b%26c"
+    assert headers == {"X-Id": "7"}
+
+
+def test_path_substitutions_are_quoted():
+    assert plan("/files/{name}", {"name": "a/b c?"}).target()[0] == "/files/a%2Fb%20c%3F"
+    path, _ = plan("/files/${name}/{kind}", {"kind": "${kind}"}).target({"name": "../etc", "kind": "x#y"})
+    assert path == "/files/..%2Fetc/x%23y"
+
+
+def test_dollar_escapes_and_braces():
+    compiled = plan("/price/$${amount}/{{literal}}", None, {"q": "$$5"}, {"X-Cost": "$${cost}"})
+    assert not compiled.dynamic
+    path, headers = compiled.target()
+    assert path == "/price/${amount}/{{literal}}?q=%245"
+    assert headers == {"X-Cost": "${cost}"}
+
+
+def test_placeholders_without_a_row_are_sent_as_they_are():
+    path, headers = plan("/users/${id}", None, None, {"X-Id": "${id}"}).target()
+    assert path == "/users/${id}"
+    assert headers == {"X-Id": "${id}"}
+
+
+def test_missing_column_is_reported():
+    with pytest.raises(CurlFrameworkException, match="no column 'id'"):
+        plan("/users/${id}").target({"name": "x"})
+
+
+def test_get_sends_no_body():
+    assert plan(payload="ignored").data() is None
+    assert plan(method="POST", payload="hello").data() == b"hello"
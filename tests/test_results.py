@@ -0,0 +1,49 @@
+import pytest
+
+from core.resources.results import ResultStore
+from core.resources.timing import PHASES, Timings
+
+
+def filled_store(phases):
+    store = ResultStore(phases=phases)
+    for index in range(100):
+        timings = Timings()
+        timings.bytes_received = 100 + index
+        for position, phase in enumerate(PHASES):
+            setattr(timings, phase, (position + 1) / 1000.0)
+        store.add(index / 1000.0, 200 if index % 10 else 503, timings)
+    store.add(1.5, "TimeoutError")
+    return store
+
+
+@pytest.mark.parametrize("phases", [False, True])
+def test_save_load_round_trip(tmp_path, phases):
+    store = filled_store(phases)
+    path = str(tmp_path / "results.bin")
+    assert store.save(path) > 0
+
+    loaded = ResultStore.load(path)
+    assert len(loaded) == len(store) == 101
+    assert loaded.phases == phases
+    assert loaded.outcomes == store.outcomes
+    assert list(loaded.columns) == list(store.columns)
+    for name, column in store.columns.items():
+        assert list(loaded.columns[name]) == list(column)
+    assert loaded.summary() == store.summary()
+
+
+def test_concat_merges_outcomes(tmp_path):
+    first, second = ResultStore(), ResultStore()
+    first.add(0.001, 200)
+    second.add(0.002, "ConnectionError")
+    second.add(0.003, 200)
+    paths = []
+    for index, store in enumerate((first, second)):
+        paths.append(str(tmp_path / "part{}.bin".format(index)))
+        store.save(paths[-1])
+
+    merged_path = str(tmp_path / "merged.bin")
+    ResultStore.concat(paths, merged_path)
+    merged = ResultStore.load(merged_path)
+    assert len(merged) == 3
+    assert [merged.outcomes[code] for code in merged.columns["outcome"]] == ["200", "ConnectionError", "200"]
@@ -0,0 +1,51 @@
+import pytest
+
+from core.resources.printer import set_synchronous
+from core.resources.utils import template_store
+from interpreter.CurlyInterpreter import CurlyInterpreter
+
+
+@pytest.fixture
+def interpreter():
+    set_synchronous(True)
+    yield CurlyInterpreter()
+    set_synchronous(False)
+
+
+@pytest.mark.parametrize("lines, line", [
+    (["use bogus"], 1),
+    (["set host example.com"], 1),
+    (["use request", "run get"], 2),
+    (["use request", "run bogus"], 2),
+    (["use request", "set nosuchoption 1"], 2),
+    (["use request", "set headers x"], 2),
+    (["use request", "delete headers missing"], 2),
+])
+def test_failing_command_stops_script(interpreter, capsys, lines, line):
+    assert not interpreter.run_script(lines + ["set host never.example"], "test.cfw")
+    assert "test.cfw:{}: ".format(line) in capsys.readouterr().out
+    assert interpreter.current_module is None or interpreter.current_module.host != "never.example"
+
+
+def test_add_takes_name_and_value(interpreter):
+    assert interpreter.run_script(["use request", "add headers X-Token abc def", "add path_params id 5",
+                                   "add query_params q 1"], "test.cfw")
+    module = interpreter.current_module
+    assert module.headers == {"X-Token": "abc def"}
+    assert module.path_params == {"id": "5"}
+    assert module.query_params == {"q": "1"}
+
+
+def test_saved_template_leaves_out_run_options(interpreter, tmp_path, monkeypatch):
+    monkeypatch.setenv("CFW_TEMPLATE_DB", str(tmp_path / "templates.db"))
+    (tmp_path / "templates.db").touch()
+    assert interpreter.run_script(["use request", "set host example.com", "set record session.log",
+                                   "set engine socket", "set workers 8", "save run_options_test"], "test.cfw")
+    saved = template_store().get("post.run_options_test")
+    assert saved["host"][0] == "example.com"
+    assert not set(saved) & {"record", "output", "data", "results", "engine", "workers"}
+
+    assert interpreter.run_script(["back", "use request", "load run_options_test"], "test.cfw")
+    module = interpreter.current_module
+    assert module.host == "example.com"
+    assert (module.record, module.engine, module.workers) == ("session.log", "socket", 8)
@@ -0,0 +1,11 @@
+from core.resources.utils import humanize_path, humanize_template, pythonize_path
+
+
+def test_humanize_template_keeps_dots_in_the_name():
+    assert humanize_template("post.v1.2") == "post/v1.2"
+    assert humanize_template("post.login") == "post/login"
+
+
+def test_module_paths_round_trip():
+    assert humanize_path("modules.request") == "modules/request"
+    assert pythonize_path(humanize_path("modules.request")) == "modules.request"